@@ -1,11 +1,31 @@
-from dataclasses import dataclass
+import dataclasses
+import os.path
+from dataclasses import dataclass, field
 
-@dataclass
+@dataclass(frozen=True)
 class ServerConfig:
     host: str = "localhost"
     port: int = 6379
     rdb_dir: str = "."
     db_filename: str = "dump.rdb"
+    # Extra (level, optname, value) triples applied to every accepted client
+    # socket, e.g. (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1).
+    socket_options: tuple = ()
+    # Joined once per config instance; every disk-touching path (RDB load,
+    # future SAVE/BGSAVE) reads this instead of re-joining.
+    rdb_path: str = field(init=False, default="")
 
-# Global config instance
+    def __post_init__(self):
+        object.__setattr__(self, "rdb_path", os.path.join(self.rdb_dir, self.db_filename))
+
+# Global config instance. Frozen so it can be shared across client threads
+# without locking; updates go through set_config(), which swaps the binding.
+# (slots=True would shave a little more per-instance memory but needs
+# Python 3.10+, and we still support 3.9.)
 config = ServerConfig()
+
+def set_config(**kwargs) -> ServerConfig:
+    """Replaces the global config with an updated frozen copy."""
+    global config
+    config = dataclasses.replace(config, **kwargs)
+    return config
@@ -2,30 +2,44 @@
 Redis Command Execution Module
 """
 
+import logging
+import mmap
 import os
 import socket
+import sys
 import threading
-import time
 
-from resp_server.config import config
+# Import the module, not the instance: set_config() rebinds config, so we must
+# read it through the module to see updates made after import.
+from resp_server import config as server_config
 from resp_server.core.context import ClientContext
+from resp_server.core.helpers import now_ms
 from resp_server.core.datastore import BLOCKING_CLIENTS, BLOCKING_CLIENTS_LOCK, BLOCKING_STREAMS, BLOCKING_STREAMS_LOCK, \
-    CHANNEL_SUBSCRIBERS, DATA_LOCK, DATA_STORE, STREAMS, \
-    cleanup_blocked_client, get_stream_max_id, \
+    CHANNEL_SUBSCRIBERS, DATA_LOCK, DATA_STORE, PUBSUB_LOCK, \
+    cleanup_blocked_client, get_last_stream_entry, get_stream_max_id, \
     increment_key_value, increment_key_value_by, delete_data_entry, is_client_subscribed, load_rdb_to_datastore, \
     lrange_rtn, \
     num_client_subscriptions, prepend_to_list, remove_elements_from_list, \
     size_of_list, append_to_list, existing_list, get_data_entry, set_list, set_string, subscribe, unsubscribe, xadd, \
+    TYPE_STRING, \
     xrange, xread
-from resp_server.protocol.resp import parse_resp_array, encode_bulk_string, encode_null_bulk_string, encode_error, encode_simple_string, encode_array, encode_integer
+from resp_server.protocol.resp import parse_resp_command, encode_bulk_string, encode_bulk_string_cached, \
+    encode_bulk_pair, encode_error, encode_simple_string, encode_array, encode_array_of_bulk_strings, \
+    encode_integer
+
+# Per-command tracing goes through this logger at DEBUG so it costs a single
+# level check (no string build, no stdout flush) when disabled. %s-style args
+# keep formatting lazy.
+log = logging.getLogger(__name__)
 
 # ============================================================================
 # CONFIGURATION AND CONSTANTS
 
-# Commands that modify data
-WRITE_COMMANDS = {
+# Commands that modify data. Frozen and interned so membership tests hash
+# once and compare by pointer identity against the interned command token.
+WRITE_COMMANDS = frozenset(map(sys.intern, (
     "SET", "LPUSH", "RPUSH", "LPOP", "XADD", "INCR", "INCRBY", "DEL"
-}
+)))
 
 # Define the 59-byte empty RDB file content (hexadecimal)
 EMPTY_RDB_BYTES = bytes.fromhex(
@@ -38,44 +52,92 @@ EMPTY_RDB_BYTES = bytes.fromhex(
 # RDB_FILE_SIZE will be determined by the actual length of the new hex string.
 RDB_HEADER = f"${len(EMPTY_RDB_BYTES)}\r\n".encode()
 
-def initialize_datastore():
-    rdb_path = os.path.join(config.rdb_dir, config.db_filename)
-    if os.path.exists(rdb_path):
-        DATA_STORE.update(load_rdb_to_datastore(rdb_path))
-    else:
-        print(f"RDB file not found at {rdb_path}, starting with empty DATA_STORE.")
-
+# Pre-concatenated header + body so a full resync handshake can be written with a
+# single sendall() and no per-request bytes concatenation.
+EMPTY_RDB_FULL_PAYLOAD = RDB_HEADER + EMPTY_RDB_BYTES
+
+# RESP Null Array, returned by empty/timed-out XREAD and BLPOP timeouts.
+NULL_ARRAY = b"*-1\r\n"
+
+# Pre-encoded static replies for the hottest commands; returning a cached
+# reference skips an encode call and a bytes allocation per request.
+RESP_OK = b"+OK\r\n"
+RESP_PONG = b"+PONG\r\n"
+RESP_NULL_BULK = b"$-1\r\n"
+RESP_EMPTY_ARRAY = b"*0\r\n"
+SYNTAX_ERR = b"-ERR syntax error\r\n"
+# PING reply while subscribed: ["pong", ""] per the pub/sub protocol.
+RESP_SUBSCRIBED_PONG = b"*2\r\n$4\r\npong\r\n$0\r\n\r\n"
+
+# Canonical spellings of option keywords. Real clients send these either
+# all-upper (redis-cli) or all-lower (several client libraries); the dict hit
+# returns the canonical interned string without allocating an upper-cased
+# copy. Mixed case is legal in Redis too and falls back to one .upper().
+_OPTION_CANON = {
+    spelling: sys.intern(canonical)
+    for canonical in ("EX", "PX", "GET", "BLOCK", "STREAMS")
+    for spelling in (canonical, canonical.lower())
+}
 
-initialize_datastore()
+def _canon_option(token: str, _canon=_OPTION_CANON) -> str:
+    return _canon.get(token) or token.upper()
 
-def _xread_serialize_response(stream_data: dict[str, list[dict]]) -> bytes:
-    """Serializes the result of xread into a RESP array response."""
+def initialize_datastore():
+    rdb_path = server_config.config.rdb_path
+    # Single stat: os.stat doubles as the existence check so we don't pay an
+    # extra syscall before the loader opens the file.
+    try:
+        file_size = os.stat(rdb_path).st_size
+    except OSError:
+        log.info("RDB file not found at %s, starting with empty DATA_STORE.", rdb_path)
+        return
+    if file_size == 0:
+        return
+
+    # Map the file instead of read()-ing it: the parser walks page-cache-backed
+    # memory directly, so peak RSS during load stays at ~1x file size.
+    with open(rdb_path, "rb") as rdb_file, \
+            mmap.mmap(rdb_file.fileno(), 0, access=mmap.ACCESS_READ) as rdb_map:
+        DATA_STORE.update(load_rdb_to_datastore(rdb_map))
+
+
+def _xread_serialize_response(stream_data: dict[str, tuple], _pair=encode_bulk_pair,
+                              _cached_bulk=encode_bulk_string_cached) -> bytes:
+    """Serializes the columnar result of xread into a RESP array response.
+
+    stream_data maps each key to parallel (ids, field_names, field_values)
+    lists; walking them index-by-index avoids per-entry dict overhead. Output
+    streams directly into a single bytearray so each byte of the reply is
+    written exactly once. Helpers are bound as default arguments so the inner
+    loop resolves them via LOAD_FAST rather than a global lookup per field.
+    Field names repeat across entries of a stream, so their bulk encoding
+    comes from the memoized encoder; values go through the uncached path.
+    """
     if not stream_data:
-        return encode_null_bulk_string().replace(b"$-1", b"*-1")
+        return NULL_ARRAY
 
-    # Outer Array: Array of [key, [entry1, entry2, ...]] # *N\r\n
-    outer_array_items = []
+    buf = bytearray()
+    append = buf.extend
 
-    for key, entries in stream_data.items():
-        encoded_entries = []
+    # Outer Array: Array of [key, [entry1, entry2, ...]]
+    append(b"*%d\r\n" % len(stream_data))
 
-        for entry in entries:
-            fields_items = []
-            for field, value in entry["fields"].items():
-                fields_items.append(encode_bulk_string(field))
-                fields_items.append(encode_bulk_string(value))
+    for key, (ids, field_names, field_values) in stream_data.items():
+        append(b"*2\r\n")
+        append(_cached_bulk(key))
+        append(b"*%d\r\n" % len(ids))
 
-            encoded_entries.append(encode_array([
-                encode_bulk_string(entry["id"]),
-                encode_array(fields_items)
-            ]))
+        for i in range(len(ids)):
+            entry_id = ids[i].encode()
+            names = field_names[i]
+            values = field_values[i]
+            # Each entry is [id, [field1, value1, ...]]; fields are stored as
+            # bytes since XADD, so the pair encode is a pure copy.
+            append(b"*2\r\n$%d\r\n%b\r\n*%d\r\n" % (len(entry_id), entry_id, 2 * len(names)))
+            for j in range(len(names)):
+                append(_pair(names[j], values[j]))
 
-        outer_array_items.append(encode_array([
-            encode_bulk_string(key),
-            encode_array(encoded_entries)
-        ]))
-
-    return encode_array(outer_array_items)
+    return bytes(buf)
 
 
 # ============================================================================
@@ -84,669 +146,779 @@ def _xread_serialize_response(stream_data: dict[str, list[dict]]) -> bytes:
 # This section contains the main command execution logic for all supported Redis commands.
 # Commands are organized by category for easier navigation and maintenance.
 
-def execute_single_command(command: str, arguments: list, client: ClientContext):
-    """
-    Executes a single Redis command and returns the appropriate response.
-    Returns:
-        bytes: RESP-formatted response
-        bool: True for special commands
-    """
-    if is_client_subscribed(client):
-        ALLOWED_COMMANDS_WHEN_SUBSCRIBED = {"SUBSCRIBE", "UNSUBSCRIBE", "PING", "QUIT", "PSUBSCRIBE", "PUNSUBSCRIBE"}
-        if command not in ALLOWED_COMMANDS_WHEN_SUBSCRIBED:
-            return encode_error(f"Can't execute '{command}' when client is subscribed")
+def _cmd_ping(arguments, client):
+    # The subscribed-mode variant is answered by the gate in
+    # execute_single_command, which already knows the subscription state.
+    return RESP_PONG
 
-    if command == "PING":
-        return encode_simple_string("PONG") if (not is_client_subscribed(client)) \
-            else b"*2\r\n" + encode_bulk_string("pong") + encode_bulk_string("")
 
-    elif command == "ECHO":
-        return encode_bulk_string(arguments[0]) if arguments \
-            else encode_error("wrong number of arguments for 'echo' command")
+def _cmd_echo(arguments, client):
+    return encode_bulk_string(arguments[0]) if arguments \
+        else encode_error("wrong number of arguments for 'echo' command")
 
-    elif command == "SET":
-        if len(arguments) < 2:
-            return encode_error("wrong number of arguments for 'set' command")
 
-        key, value = arguments[0], arguments[1]
-        duration_ms = None
+def _cmd_set(arguments, client):
+    if len(arguments) < 2:
+        return encode_error("wrong number of arguments for 'set' command")
 
-        i = 2
-        if i < len(arguments):
-            option = arguments[i].upper()
+    key, value = arguments[0], arguments[1]
+    duration_ms = None
 
-            if option not in ("EX", "PX") or i + 1 >= len(arguments):
-                return encode_error("syntax error")
+    if len(arguments) > 2:
+        option = _canon_option(arguments[2])
 
-            try:
-                ttl = int(arguments[i + 1])
-            except ValueError:
-                return encode_error("value is not an integer or out of range")
+        if (option != "EX" and option != "PX") or len(arguments) < 4:
+            return SYNTAX_ERR
+
+        try:
+            ttl = int(arguments[3])
+        except ValueError:
+            return encode_error("value is not an integer or out of range")
 
-            duration_ms = ttl * 1000 if option == "EX" else ttl
+        duration_ms = ttl * 1000 if option == "EX" else ttl
 
-        current_time = int(time.time() * 1000)
-        expiry_timestamp = current_time + duration_ms if duration_ms is not None else None
+    current_time = now_ms()
+    expiry_timestamp = current_time + duration_ms if duration_ms is not None else None
 
-        set_string(key, value, expiry_timestamp)
-        return encode_simple_string("OK")
+    set_string(key, value, expiry_timestamp)
+    return RESP_OK
 
-    elif command == "GET":
-        if not arguments:
-            response = b"-ERR wrong number of arguments for 'get' command\r\n"
-            return response
 
-        key = arguments[0]
+def _cmd_get(arguments, client):
+    if not arguments:
+        response = b"-ERR wrong number of arguments for 'get' command\r\n"
+        return response
 
-        # Use the data store function to get the value with expiry check
-        data_entry = get_data_entry(key)
+    key = arguments[0]
 
-        if data_entry is None:
-            response = encode_null_bulk_string()  # RESP Null Bulk String
-        else:
-            # Check for correct type (important: we only support string GET for now)
-            response = (
-                encode_error("WRONGTYPE Operation against a key holding the wrong kind of value")
-                if data_entry.get("type") != "string"
-                else encode_bulk_string(data_entry["value"])
-            )
+    # Use the data store function to get the value with expiry check
+    data_entry = get_data_entry(key)
+
+    if data_entry is None:
+        response = RESP_NULL_BULK  # RESP Null Bulk String
+    elif data_entry.type is not TYPE_STRING:
+        # Check for correct type (important: we only support string GET for now)
+        response = encode_error("WRONGTYPE Operation against a key holding the wrong kind of value")
+    else:
+        # Int-encoded values materialize their decimal string only here.
+        value = data_entry.value
+        response = encode_bulk_string(str(value) if data_entry.is_int else value)
+
+    # client.sendall(response
+    return response
+
+
+def _cmd_lrange(arguments, client):
+    if not arguments or len(arguments) < 3:
+        return encode_error("wrong number of arguments for 'lrange' command")
 
+    list_key = arguments[0]
+    start = int(arguments[1])
+    end = int(arguments[2])
+
+    list_elements = lrange_rtn(list_key, start, end)
+
+    # Single-pass streaming encode; no per-element intermediates.
+    return encode_array_of_bulk_strings(list_elements)
+
+
+def _cmd_lpush(arguments, client):
+    # Key plus at least one element; with no elements the push loop below
+    # would never assign a size to report.
+    if len(arguments) < 2:
+        response = b"-ERR wrong number of arguments for 'lpush' command\r\n"
         # client.sendall(response
         return response
 
-    elif command == "LRANGE":
-        if not arguments or len(arguments) < 3:
-            return encode_error("wrong number of arguments for 'lrange' command")
+    list_key = arguments[0]
+    elements = arguments[1:]
 
-        list_key = arguments[0]
-        start = int(arguments[1])
-        end = int(arguments[2])
+    # The push primitives report the size after insertion, so no extra
+    # size_of_list lock acquire is needed.
+    if existing_list(list_key):
+        for element in elements:
+            size = prepend_to_list(list_key, element)
+    else:
+        size = set_list(list_key, elements, None)
 
-        list_elements = lrange_rtn(list_key, start, end)
-        
-        # Convert strings to encoded bulk strings
-        encoded_elements = [encode_bulk_string(e) for e in list_elements]
-        return encode_array(encoded_elements)
+    return encode_integer(size)
 
-    elif command == "LPUSH":
-        if not arguments:
-            response = b"-ERR wrong number of arguments for 'lpush' command\r\n"
-            # client.sendall(response
-            return response
 
-        list_key = arguments[0]
-        elements = arguments[1:]
+def _cmd_llen(arguments, client):
+    if not arguments:
+        return encode_error("wrong number of arguments for 'llen' command")
 
-        if existing_list(list_key):
-            for element in elements:
-                prepend_to_list(list_key, element)
-        else:
-            set_list(list_key, elements, None)
+    list_key = arguments[0]
+    size = size_of_list(list_key)
+    return encode_integer(size)
 
-        size = size_of_list(list_key)
-        return encode_integer(size)
 
-    elif command == "LLEN":
-        if not arguments:
-            return encode_error("wrong number of arguments for 'llen' command")
+def _cmd_lpop(arguments, client):
+    if not arguments:
+        return encode_error("wrong number of arguments for 'lpop' command")
 
-        list_key = arguments[0]
-        size = size_of_list(list_key)
-        return encode_integer(size)
+    list_key = arguments[0]
+    arguments = arguments[1:]
 
-    elif command == "LPOP":
-        if not arguments:
-            return encode_error("wrong number of arguments for 'lpop' command")
+    if not existing_list(list_key):
+        return RESP_NULL_BULK
 
-        list_key = arguments[0]
-        arguments = arguments[1:]
+    if not arguments:
+        list_elements = remove_elements_from_list(list_key, 1)
+    else:
+        list_elements = remove_elements_from_list(list_key, int(arguments[0]))
+    if list_elements is None:
+        return RESP_NULL_BULK
 
-        if not existing_list(list_key):
-            return encode_null_bulk_string()
+    encoded_elements = [encode_bulk_string(e) for e in list_elements]
 
-        if not arguments:
-            list_elements = remove_elements_from_list(list_key, 1)
-        else:
-            list_elements = remove_elements_from_list(list_key, int(arguments[0]))
-        if list_elements is None:
-            return encode_null_bulk_string()
+    if len(encoded_elements) == 1:
+        return encoded_elements[0]
+    else:
+        return encode_array(encoded_elements)
 
-        encoded_elements = [encode_bulk_string(e) for e in list_elements]
 
-        if len(encoded_elements) == 1:
-            return encoded_elements[0]
-        else:
-            return encode_array(encoded_elements)
+def _cmd_rpush(arguments, client):
+    # 1. Argument and Key setup. Key plus at least one element; with no
+    #    elements the push loop below would never assign a size to report.
+    if len(arguments) < 2:
+        return b"-ERR wrong number of arguments for 'rpush' command\r\n"
 
-    elif command == "RPUSH":
-        # 1. Argument and Key setup
-        if not arguments:
-            # No arguments -> ignore / error (your code returns True and keeps listening)
-            return True
+    list_key = arguments[0]
+    elements = arguments[1:]
 
-        list_key = arguments[0]
-        elements = arguments[1:]
+    # 2. Add elements (see ARCHITECTURE.md for locking details). The push
+    #    primitives report the size after insertion, saving a size_of_list
+    #    lock acquire per call.
+    if existing_list(list_key):
+         for element in elements:
+             size_to_report = append_to_list(list_key, element)
+    else:
+         size_to_report = set_list(list_key, elements, None)
+
+    # 3. Check for blocked clients (wake up FIFO)
+    blocked_waiter = None
+
+    with BLOCKING_CLIENTS_LOCK:
+        waiters = BLOCKING_CLIENTS.get(list_key)
+        if waiters:
+            # O(1) popleft per waiter; timed-out waiters stay in the deque
+            # flagged as cancelled and are skipped here.
+            while waiters:
+                candidate = waiters.popleft()
+                if not candidate.cancelled:
+                    blocked_waiter = candidate
+                    break
+            if not waiters:
+                del BLOCKING_CLIENTS[list_key]
+
+    if blocked_waiter:
+        # 3a. When serving a blocked client, we must remove an element from the list.
+        #     remove_elements_from_list pops from the head (LPOP semantics).
+        #     This returns the element that will be sent to the blocked client.
+        popped_elements = remove_elements_from_list(list_key, 1)
+
+        # (You already computed size_to_report before popping; do NOT recalc it here,
+        #  since Redis returns the size *after insertion*, not after serving waiters.)
+
+        if not popped_elements:
+            # Someone (an LPOP, or a BLPOP claiming a missed element) consumed
+            # the element between our waiter pop and the remove. Re-queue the
+            # waiter at the front so it keeps its turn for the next push.
+            with BLOCKING_CLIENTS_LOCK:
+                BLOCKING_CLIENTS[list_key].appendleft(blocked_waiter)
+
+        if popped_elements:
+            popped_element = popped_elements[0]
+
+            # 3b. Build the RESP array that BLPOP expects:
+            #     *2\r\n
+            #     $<len(key)>\r\n<key>\r\n
+            #     $<len(element)>\r\n<element>\r\n
+            # Built here, outside every lock, with a single join — the waiter
+            # registry and stripe locks are already released, so encoding
+            # never extends a critical section.
+            blpop_response = b"".join((
+                b"*2\r\n",
+                encode_bulk_string(list_key),
+                encode_bulk_string(popped_element),
+            ))
+
+            blocked_client_socket = blocked_waiter.client_socket
+
+            # Send the BLPOP response directly to the blocked client's socket.
+            # We do this *before* set() so that when the blocked thread wakes it
+            # can safely assume the response has already been sent (avoids a race).
+            try:
+                blocked_client_socket.sendall(blpop_response)
+            except Exception:
+                # If the blocked client disconnected between RPUSH discovering it and us sending,
+                # sendall will fail; we catch and ignore because we still need to notify the thread
+                # (or let its wait time out and the cleanup code remove it).
+                pass
 
-        # 2. Add elements (see ARCHITECTURE.md for locking details)
-        if existing_list(list_key):
-             for element in elements:
-                 append_to_list(list_key, element)
-        else:
-             set_list(list_key, elements, None)
+            # 3c. Wake up the blocked thread.
+            blocked_waiter.set()
 
-        size_to_report = size_of_list(list_key)
+    # 4. Return size
+    return encode_integer(size_to_report)
 
-        # 3. Check for blocked clients (wake up FIFO)
-        blocked_client_condition = None
 
-        with BLOCKING_CLIENTS_LOCK:
-            if list_key in BLOCKING_CLIENTS and BLOCKING_CLIENTS[list_key]:
-                blocked_client_condition = BLOCKING_CLIENTS[list_key].pop(0)
-
-        if blocked_client_condition:
-            # 3a. When serving a blocked client, we must remove an element from the list.
-            #     remove_elements_from_list pops from the head (LPOP semantics).
-            #     This returns the element that will be sent to the blocked client.
-            popped_elements = remove_elements_from_list(list_key, 1)
-
-            # (You already computed size_to_report before popping; do NOT recalc it here,
-            #  since Redis returns the size *after insertion*, not after serving waiters.)
-
-            if popped_elements:
-                popped_element = popped_elements[0]
-
-                # 3b. Build the RESP array that BLPOP expects:
-                #     *2\r\n
-                #     $<len(key)>\r\n<key>\r\n
-                #     $<len(element)>\r\n<element>\r\n
-                blpop_response = encode_array([
-                    encode_bulk_string(list_key),
-                    encode_bulk_string(popped_element)
-                ])
-
-                blocked_client_socket = blocked_client_condition.client_socket
-
-                # Send the BLPOP response directly to the blocked client's socket.
-                # We do this *before* notify() so that when the blocked thread wakes it
-                # can safely assume the response has already been sent (avoids a race).
-                try:
-                    blocked_client_socket.sendall(blpop_response)
-                except Exception:
-                    # If the blocked client disconnected between RPUSH discovering it and us sending,
-                    # sendall will fail; we catch and ignore because we still need to notify the thread
-                    # (or let its wait time out and the cleanup code remove it).
-                    pass
+def _cmd_blpop(arguments, client):
+    # 1. Argument and Key setup
+    if len(arguments) != 2:
+        # Wrong number of args
+        return True
+
+    list_key = arguments[0]
+    try:
+        # Redis accepts fractional seconds for the timeout (e.g., 0.4).
+        # threading.Event.wait() accepts float seconds as well, so use float().
+        timeout = float(arguments[1])
+    except ValueError:
+        # If parsing fails, send an error to the client (avoid silent failure).
+        response = b"-ERR timeout is not a float\r\n"
+        # client.sendall(response
+        return response
 
-                # 3c. Wake up the blocked thread. 
-                with blocked_client_condition:
-                    blocked_client_condition.notify()
+    # 2. Fast path: if the list already has elements, pop and return immediately.
+    #    This mirrors Redis: BLPOP behaves like LPOP when the list is non-empty.
+    if size_of_list(list_key) > 0:
+        list_elements = remove_elements_from_list(list_key, 1)
 
-        # 4. Return size
-        return encode_integer(size_to_report)
+        if list_elements:
+            popped_element = list_elements[0]
 
-    elif command == "BLPOP":
-        # 1. Argument and Key setup
-        if len(arguments) != 2:
-            # Wrong number of args
-            return True
+            # Construct the RESP array [key, popped_element] and send it.
+            response = encode_array([
+                encode_bulk_string(list_key),
+                encode_bulk_string(popped_element)
+            ])
 
-        list_key = arguments[0]
-        try:
-            # Redis accepts fractional seconds for the timeout (e.g., 0.4).
-            # threading.Condition.wait() accepts float seconds as well, so use float().
-            timeout = float(arguments[1])
-        except ValueError:
-            # If parsing fails, send an error to the client (avoid silent failure).
-            response = b"-ERR timeout is not a float\r\n"
             # client.sendall(response
             return response
-
-        # 2. Fast path: if the list already has elements, pop and return immediately.
-        #    This mirrors Redis: BLPOP behaves like LPOP when the list is non-empty.
-        if size_of_list(list_key) > 0:
-            list_elements = remove_elements_from_list(list_key, 1)
-
-            if list_elements:
-                popped_element = list_elements[0]
-
-                # Construct the RESP array [key, popped_element] and send it.
-                response = encode_array([
-                    encode_bulk_string(list_key),
-                    encode_bulk_string(popped_element)
-                ])
-
-                # client.sendall(response
-                return response
-            # If remove_elements_from_list returns None unexpectedly, fall through to blocking.
-            # (This is unlikely if size_of_list returned > 0, but handling it avoids crashes.)
-
-        # 3. Blocking logic (list empty / non-existent)
-        #    We create a Condition object that the current thread will wait on.
-        client_condition = threading.Condition()
-        # Store the client socket on the Condition so RPUSH can send the response
-        # directly to the waiting client's socket when an element arrives.
-        client_condition.client_socket = client
-
-        # Register this Condition in BLOCKING_CLIENTS under the list_key.
-        # Use BLOCKING_CLIENTS_LOCK to guard concurrent access to the shared dict.
+        # If remove_elements_from_list returns None unexpectedly, fall through to blocking.
+        # (This is unlikely if size_of_list returned > 0, but handling it avoids crashes.)
+
+    # 3. Blocking logic (list empty / non-existent)
+    #    An Event is the one-shot wakeup this needs: set() by the producer,
+    #    wait() here, no extra lock acquire/release around either side — and a
+    #    set() that lands before wait() is never lost.
+    client_waiter = threading.Event()
+    # Store the client socket on the waiter so RPUSH can send the response
+    # directly to the waiting client's socket when an element arrives.
+    client_waiter.client_socket = client
+    client_waiter.cancelled = False
+
+    # Register this waiter in BLOCKING_CLIENTS under the list_key.
+    # Use BLOCKING_CLIENTS_LOCK to guard concurrent access to the shared dict.
+    with BLOCKING_CLIENTS_LOCK:
+        waiters = BLOCKING_CLIENTS[list_key]
+        waiters.append(client_waiter)
+        # Close the lost-wakeup window: an RPUSH that ran between the fast
+        # path above and this registration found no waiter to notify, so its
+        # element is sitting in the list. Re-check while still holding the
+        # registry lock — producers pair their push with the waiter pop under
+        # this same lock, so the element can't be handed to us twice.
+        list_elements = remove_elements_from_list(list_key, 1)
+        if list_elements:
+            waiters.remove(client_waiter)
+            if not waiters:
+                del BLOCKING_CLIENTS[list_key]
+            return encode_array([
+                encode_bulk_string(list_key),
+                encode_bulk_string(list_elements[0])
+            ])
+
+    # Wait for notification or timeout (timeout 0 means block indefinitely).
+    notified = client_waiter.wait(timeout if timeout else None)
+
+    # 4. Post-block handling
+    if notified:
+        # If True, RPUSH already sent the BLPOP response to the socket, so there's
+        # nothing more to do here. Just return True and continue listening for commands.
+        return True
+    else:
+        # Timeout occurred. Flag the waiter as cancelled instead of scanning
+        # the deque to remove it (O(N)); the next RPUSH on this key discards
+        # cancelled waiters in O(1) as it pops them.
         with BLOCKING_CLIENTS_LOCK:
-            BLOCKING_CLIENTS.setdefault(list_key, []).append(client_condition)
+            client_waiter.cancelled = True
 
-        # Wait for notification or timeout.
-        with client_condition:
-            if timeout == 0:
-                notified = client_condition.wait()
-            else:
-                notified = client_condition.wait(timeout)
+        # Send Null Array response on timeout: Redis returns "*-1\r\n" for BLPOP timeout.
+        response = NULL_ARRAY
+        # client.sendall(response
+        return response
 
-        # 4. Post-block handling
-        if notified:
-            # If True, RPUSH already sent the BLPOP response to the socket, so there's
-            # nothing more to do here. Just return True and continue listening for commands.
-            return True
-        else:
-            # Timeout occurred. We must remove this client from the BLOCKING_CLIENTS registry
-            # because RPUSH may never visit it (or might have visited it but failed to notify).
-            with BLOCKING_CLIENTS_LOCK:
-                # Defensive: only remove if it's still present (RPUSH could have popped it)
-                if client_condition in BLOCKING_CLIENTS.get(list_key, []):
-                    BLOCKING_CLIENTS[list_key].remove(client_condition)
-                    # If no more waiters, delete empty list to keep the dict tidy
-                    if not BLOCKING_CLIENTS[list_key]:
-                        del BLOCKING_CLIENTS[list_key]
-
-            # Send Null Array response on timeout: Redis returns "*-1\r\n" for BLPOP timeout.
-            response = b"*-1\r\n"
-            # client.sendall(response
-            return response
 
-    elif command == "CONFIG":
-        if len(arguments) != 2 or arguments[0].upper() != "GET":
-            # Handle wrong arguments or non-GET subcommands
-            response = b"-ERR wrong number of arguments for 'CONFIG GET' command\r\n"
-            # client.sendall(response
-            return response
+def _cmd_config(arguments, client):
+    if len(arguments) != 2 or _canon_option(arguments[0]) != "GET":
+        # Handle wrong arguments or non-GET subcommands
+        response = b"-ERR wrong number of arguments for 'CONFIG GET' command\r\n"
+        # client.sendall(response
+        return response
 
-        # 1. Extract the parameter name requested by the client
-        param_name = arguments[1].lower()
-        value = None
-
-        if param_name == "dir":
-            value = config.rdb_dir
-        elif param_name == "dbfilename":
-            value = config.db_filename
-
-        # 2. Handle unknown parameters
-        if value is None:
-            # Per Redis spec, CONFIG GET for an unknown param returns nil array or empty array.
-            # A simple response of the parameter name and empty string is often used in clones.
-            value = ""
-            # We should still use the param_name for the first element
-
-        # --- Correct RESP Serialization ---
-
-        # 3. Encode strings and return Array
-        return encode_array([
-            encode_bulk_string(param_name),
-            encode_bulk_string(value)
-        ])
-
-    elif command == "KEYS":
-        if len(arguments) != 1:
-            response = b"-ERR wrong number of arguments for 'KEYS' command\r\n"
-            # client.sendall(response
-            return response
+    # 1. Extract the parameter name requested by the client
+    param_name = arguments[1].lower()
+    value = None
 
-        pattern = arguments[0]
+    config = server_config.config
+    if param_name == "dir":
+        value = config.rdb_dir
+    elif param_name == "dbfilename":
+        value = config.db_filename
 
-        # Simple pattern matching: only supports '*' wildcard
-        with DATA_LOCK:
-            matching_keys = []
-            for key in DATA_STORE.keys():
-                if pattern == "*" or pattern == key:
-                    matching_keys.append(key)
-
-        encoded_keys = [encode_bulk_string(k) for k in matching_keys]
-        return encode_array(encoded_keys)
-
-    elif command == "SUBSCRIBE":
-        # Construct RESP Array response
-        channel = arguments[0] if arguments else ""
-        subscribe(client, channel)
-        num_subscriptions = num_client_subscriptions(client)
-
-        return encode_array([
-            encode_bulk_string("subscribe"),
-            encode_bulk_string(channel),
-            encode_integer(num_subscriptions)
-        ])
-
-    elif command == "PUBLISH":
-        if len(arguments) != 2:
-            response = b"-ERR wrong number of arguments for 'PUBLISH' command\r\n"
-            # client.sendall(response
-            return response
+    # 2. Handle unknown parameters
+    if value is None:
+        # Per Redis spec, CONFIG GET for an unknown param returns nil array or empty array.
+        # A simple response of the parameter name and empty string is often used in clones.
+        value = ""
+        # We should still use the param_name for the first element
 
-        channel = arguments[0]
-        message = arguments[1]
-        recipients = 0
+    # --- Correct RESP Serialization ---
 
-        with BLOCKING_CLIENTS_LOCK:
-            if channel in CHANNEL_SUBSCRIBERS:
-                subscribers = CHANNEL_SUBSCRIBERS[channel]
-                for subscriber in subscribers:
-                    # Construct the message RESP Array
-                    response = encode_array([
-                        encode_bulk_string("message"),
-                        encode_bulk_string(channel),
-                        encode_bulk_string(message)
-                    ])
-                    try:
-                        subscriber.sendall(response)
-                        recipients += 1
-                    except Exception:
-                        pass  # Ignore send errors for subscribers
-
-        # Send number of recipients to publisher
-        return encode_integer(recipients)
-
-    elif command == "UNSUBSCRIBE":
-        channel = arguments[0] if arguments else ""
-
-        unsubscribe(client, channel)
-        num_subscriptions = num_client_subscriptions(client)
-
-        return encode_array([
-            encode_bulk_string("unsubscribe"),
-            encode_bulk_string(channel),
-            encode_integer(num_subscriptions)
-        ])
-
-
-    elif command == "TYPE":
-        if len(arguments) < 1:
-            response = b"-ERR wrong number of arguments for 'TYPE' command\r\n"
-            # client.sendall(response
-            return response
+    # 3. Encode strings and return Array
+    return encode_array([
+        encode_bulk_string(param_name),
+        encode_bulk_string(value)
+    ])
 
-        key = arguments[0]
 
-        data_entry = get_data_entry(key)
+def _cmd_keys(arguments, client):
+    if len(arguments) != 1:
+        response = b"-ERR wrong number of arguments for 'KEYS' command\r\n"
+        # client.sendall(response
+        return response
 
-        if data_entry is None:
-            type_str = "none"
-        else:
-            type_str = data_entry.get("type", "none")
+    pattern = arguments[0]
+
+    # Simple pattern matching: only supports '*' wildcard. '*' takes an O(N)
+    # key snapshot (the lock is released before any encoding); anything else
+    # is an exact match, i.e. a single dict lookup.
+    if pattern == "*":
+        with DATA_LOCK:
+            matching_keys = list(DATA_STORE)
+    else:
+        with DATA_LOCK:
+            matching_keys = [pattern] if pattern in DATA_STORE else []
 
-        return encode_bulk_string(type_str)
+    return encode_array_of_bulk_strings(matching_keys)
 
+
+def _cmd_subscribe(arguments, client):
+    # Construct RESP Array response
+    channel = arguments[0] if arguments else ""
+    subscribe(client, channel)
+    num_subscriptions = num_client_subscriptions(client)
+
+    return encode_array([
+        encode_bulk_string("subscribe"),
+        encode_bulk_string(channel),
+        encode_integer(num_subscriptions)
+    ])
+
+
+def _cmd_publish(arguments, client):
+    if len(arguments) != 2:
+        response = b"-ERR wrong number of arguments for 'PUBLISH' command\r\n"
         # client.sendall(response
         return response
 
-    elif command == "XADD":
-        # XADD requires at least: key, id, field, value (4 arguments), and even number of field/value pairs
+    channel = arguments[0]
+    message = arguments[1]
+    recipients = 0
+
+    # Encode the message RESP array once; it is identical for every
+    # subscriber, so fan-out is just N sendall calls on one buffer.
+    response = encode_array([
+        encode_bulk_string("message"),
+        encode_bulk_string(channel),
+        encode_bulk_string(message)
+    ])
+
+    with PUBSUB_LOCK:
+        if channel in CHANNEL_SUBSCRIBERS:
+            subscribers = CHANNEL_SUBSCRIBERS[channel]
+            for subscriber in subscribers:
+                try:
+                    subscriber.sendall(response)
+                    recipients += 1
+                except Exception:
+                    pass  # Ignore send errors for subscribers
 
-        if len(arguments) < 4 or (len(arguments) - 2) % 2 != 0:
-            response = b"-ERR wrong number of arguments for 'XADD' command\r\n"
-            # client.sendall(response
-            return response
+    # Send number of recipients to publisher
+    return encode_integer(recipients)
 
-        key = arguments[0]
-        entry_id = arguments[1]
-        fields = {}
-        for i in range(2, len(arguments) - 1, 2):
-            fields[arguments[i]] = arguments[i + 1]
 
-        new_entry_id_or_error = xadd(key, entry_id, fields)
+def _cmd_unsubscribe(arguments, client):
+    channel = arguments[0] if arguments else ""
 
-        i  # Check if xadd returned an error (RESP errors start with '-')
-        if new_entry_id_or_error.startswith(b'-'):
-            response = new_entry_id_or_error
-            # client.sendall(response
-            return response
-        else:
-            # Success: new_entry_id_or_error is the raw ID bytes (e.g. b"1-0").
-            # Format as a RESP Bulk String. Fixed the incorrect .encode() call on a bytes object.
-            raw_id_bytes = new_entry_id_or_error
-            blocked_client_condition = None
-            new_entry = None
+    unsubscribe(client, channel)
+    num_subscriptions = num_client_subscriptions(client)
 
-            with BLOCKING_STREAMS_LOCK:
-                if key in BLOCKING_STREAMS and BLOCKING_STREAMS[key]:
-                    blocked_client_condition = BLOCKING_STREAMS[key].pop(0)
+    return encode_array([
+        encode_bulk_string("unsubscribe"),
+        encode_bulk_string(channel),
+        encode_integer(num_subscriptions)
+    ])
 
-            if blocked_client_condition:
-                # Get the single new entry that was just added (it's the last one)
-                with DATA_LOCK:  # Acquire lock to safely access STREAMS
-                    if key in STREAMS and STREAMS[key]:
-                        new_entry = STREAMS[key][-1]
 
-                if new_entry:
-                    # Prepare the data structure for serialization (single entry for a single stream)
-                    stream_data_to_send = {key: [new_entry]}
-                    xread_block_response = _xread_serialize_response(stream_data_to_send)
+def _cmd_type(arguments, client):
+    if len(arguments) < 1:
+        response = b"-ERR wrong number of arguments for 'TYPE' command\r\n"
+        # client.sendall(response
+        return response
 
-                    blocked_client_socket = blocked_client_condition.client_socket
+    key = arguments[0]
 
-                    # Send the XREAD BLOCK response directly to the blocked client's socket.
-                    try:
-                        blocked_client_socket.sendall(xread_block_response)
-                    except Exception:
-                        pass  # Ignore send errors
+    data_entry = get_data_entry(key)
 
-                    # Wake up blocked thread
-                    with blocked_client_condition:
-                        blocked_client_condition.notify()
+    if data_entry is None:
+        type_str = "none"
+    else:
+        type_str = data_entry.type
 
-            return encode_bulk_string(raw_id_bytes.decode())
-            # client.sendall(response
-            return response
+    return encode_bulk_string(type_str)
 
-    elif command == "XRANGE":
-        if len(arguments) < 3:
-            response = b"-ERR wrong number of arguments for 'XRANGE' command\r\n"
-            # client.sendall(response
-            return response
+    # client.sendall(response
+    return response
+
+
+def _cmd_xadd(arguments, client):
+    # XADD requires at least: key, id, field, value (4 arguments), and even number of field/value pairs
+
+    if len(arguments) < 4 or (len(arguments) - 2) % 2 != 0:
+        response = b"-ERR wrong number of arguments for 'XADD' command\r\n"
+        # client.sendall(response
+        return response
 
-        key = arguments[0]
-        start_id = arguments[1]
-        end_id = arguments[2]
+    key = arguments[0]
+    entry_id = arguments[1]
+    fields = {}
+    for i in range(2, len(arguments) - 1, 2):
+        fields[arguments[i]] = arguments[i + 1]
 
-        entries = xrange(key, start_id, end_id)
+    new_entry_id_or_error = xadd(key, entry_id, fields)
 
-        encoded_entries = []
-        for entry in entries:
-            fields_items = []
-            for field, value in entry["fields"].items():
-                fields_items.append(encode_bulk_string(field))
-                fields_items.append(encode_bulk_string(value))
+    # Check if xadd returned an error (errors come back already RESP-encoded as bytes)
+    if isinstance(new_entry_id_or_error, bytes):
+        response = new_entry_id_or_error
+        # client.sendall(response
+        return response
+    else:
+        # Success: new_entry_id_or_error is the new ID string (e.g. "1-0").
+        new_entry_id = new_entry_id_or_error
+        blocked_waiter = None
+        new_entry = None
+
+        with BLOCKING_STREAMS_LOCK:
+            waiters = BLOCKING_STREAMS.get(key)
+            if waiters:
+                while waiters:
+                    candidate = waiters.popleft()
+                    if not candidate.cancelled:
+                        blocked_waiter = candidate
+                        break
+                if not waiters:
+                    del BLOCKING_STREAMS[key]
+
+        if blocked_waiter:
+            # Get the single new entry that was just added (it's the last one)
+            new_entry = get_last_stream_entry(key)
+
+            if new_entry:
+                entry_id_str, field_keys, field_values = new_entry
+                # Prepare the columnar form for serialization (single entry for a single stream)
+                stream_data_to_send = {
+                    key: ([entry_id_str], [field_keys], [field_values])
+                }
+                xread_block_response = _xread_serialize_response(stream_data_to_send)
+
+                blocked_client_socket = blocked_waiter.client_socket
+
+                # Send the XREAD BLOCK response directly to the blocked client's socket.
+                try:
+                    blocked_client_socket.sendall(xread_block_response)
+                except Exception:
+                    pass  # Ignore send errors
 
-            encoded_entries.append(encode_array([
-                encode_bulk_string(entry["id"]),
-                encode_array(fields_items)
-            ]))
+                # Wake up blocked thread
+                blocked_waiter.set()
 
-        return encode_array(encoded_entries)
+        return encode_bulk_string(new_entry_id)
 
-    elif command == "XREAD":
-        # Format: XREAD [BLOCK <ms>] STREAMS key1 key2 ... id1 id2 ...
 
-        # 1. Parse optional BLOCK argument
-        arguments_start_index = 0
-        timeout_ms = None
+def _cmd_xrange(arguments, client):
+    if len(arguments) < 3:
+        response = b"-ERR wrong number of arguments for 'XRANGE' command\r\n"
+        # client.sendall(response
+        return response
 
-        if len(arguments) >= 3 and arguments[0].upper() == "BLOCK":
-            try:
-                # Timeout is in milliseconds, convert to seconds for threading.wait
-                timeout_ms = int(arguments[1])
-                arguments_start_index = 2
-            except ValueError:
-                response = b"-ERR timeout is not an integer\r\n"
-                # client.sendall(response
-                return response
-
-        # 2. Check for STREAMS keyword and argument count
-        if len(arguments) < arguments_start_index + 3 or arguments[arguments_start_index].upper() != "STREAMS":
-            response = b"-ERR wrong number of arguments or missing STREAMS keyword for 'XREAD' command\r\n"
-            # client.sendall(response
-            return response
+    key = arguments[0]
+    start_id = arguments[1]
+    end_id = arguments[2]
 
-        # 3. Find the split point between keys and IDs
-        streams_keyword_index = arguments_start_index
-        args_after_streams = arguments[streams_keyword_index + 1:]
-        num_args_after_streams = len(args_after_streams)
+    entries = xrange(key, start_id, end_id)
 
-        if num_args_after_streams % 2 != 0:
-            response = b"-ERR unaligned key/id pairs for 'XREAD' command\r\n"
-            # client.sendall(response
-            return response
+    # Stream the whole reply into one bytearray: outer header, then each
+    # entry as [id, [field1, value1, ...]] using the fused pair encoder on
+    # the parallel bytes lists stored since XADD.
+    buf = bytearray(b"*%d\r\n" % len(entries))
+    extend = buf.extend
+    for entry_id_str, field_keys, field_values in entries:
+        entry_id = entry_id_str.encode()
+        extend(b"*2\r\n$%d\r\n%b\r\n*%d\r\n" % (len(entry_id), entry_id, 2 * len(field_keys)))
+        for j in range(len(field_keys)):
+            extend(encode_bulk_pair(field_keys[j], field_values[j]))
 
-        num_keys = num_args_after_streams // 2
+    return bytes(buf)
 
-        keys_start_index = 0
-        keys = args_after_streams[keys_start_index: keys_start_index + num_keys]
-        ids_start_index = keys_start_index + num_keys
-        ids = args_after_streams[ids_start_index:]
 
-        resolved_ids = []
-        for key, last_id in zip(keys, ids):
-            if last_id == "$":
-                resolved_ids.append(get_stream_max_id(key))
-            else:
-                resolved_ids.append(last_id)
+def _cmd_xread(arguments, client):
+    # Format: XREAD [BLOCK <ms>] STREAMS key1 key2 ... id1 id2 ...
 
-        # 4. Main XREAD logic loop (synchronous part - fast path)
-        stream_data = xread(keys, resolved_ids)
+    # 1. Parse optional BLOCK argument
+    arguments_start_index = 0
+    timeout_ms = None
 
-        if stream_data:
-            # Non-blocking path: Data is available. Serialize and send immediately.
-            response = _xread_serialize_response(stream_data)
+    if len(arguments) >= 3 and _canon_option(arguments[0]) == "BLOCK":
+        try:
+            # Timeout is in milliseconds, convert to seconds for threading.wait
+            timeout_ms = int(arguments[1])
+            arguments_start_index = 2
+        except ValueError:
+            response = b"-ERR timeout is not an integer\r\n"
             # client.sendall(response
             return response
 
-        # 5. Blocking path
-        if timeout_ms is not None:
-            # We are blocking: list of entries is empty.
+    # 2. Check for STREAMS keyword and argument count
+    if len(arguments) < arguments_start_index + 3 or _canon_option(arguments[arguments_start_index]) != "STREAMS":
+        response = b"-ERR wrong number of arguments or missing STREAMS keyword for 'XREAD' command\r\n"
+        # client.sendall(response
+        return response
 
-            if timeout_ms == 0:
-                # BLOCK 0 means block indefinitely.
-                timeout = None
-            else:
-                # Convert ms to seconds.
-                timeout = timeout_ms / 1000.0
+    # 3. Find the split point between keys and IDs
+    streams_keyword_index = arguments_start_index
+    args_after_streams = arguments[streams_keyword_index + 1:]
+    num_args_after_streams = len(args_after_streams)
 
-            # Since only one key/id pair is supported in this stage, enforce it for blocking
-            if len(keys) != 1:
-                response = b"-ERR only single key blocking supported in this stage\r\n"
-                # client.sendall(response
-                return response
+    if num_args_after_streams % 2 != 0:
+        response = b"-ERR unaligned key/id pairs for 'XREAD' command\r\n"
+        # client.sendall(response
+        return response
 
-            key_to_block = keys[0]
+    num_keys = num_args_after_streams // 2
 
-            # Create and register the condition
-            client_condition = threading.Condition()
-            client_condition.client_socket = client
-            client_condition.key = key_to_block
+    keys_start_index = 0
+    keys = args_after_streams[keys_start_index: keys_start_index + num_keys]
+    ids_start_index = keys_start_index + num_keys
+    ids = args_after_streams[ids_start_index:]
 
-            with BLOCKING_STREAMS_LOCK:
-                BLOCKING_STREAMS.setdefault(key_to_block, []).append(client_condition)
-
-            # Wait for notification or timeout
-            notified = False
-            with client_condition:
-                if timeout is None:
-                    notified = client_condition.wait()
-                else:
-                    notified = client_condition.wait(timeout)
-
-            # 6. Post-block handling
-            if notified:
-                # If True, XADD already sent the response.
-                return None
-            else:
-                # Timeout occurred. Clean up the blocking registration.
-                with BLOCKING_STREAMS_LOCK:
-                    if client_condition in BLOCKING_STREAMS.get(key_to_block, []):
-                        BLOCKING_STREAMS[key_to_block].remove(client_condition)
-                        if not BLOCKING_STREAMS[key_to_block]:
-                            del BLOCKING_STREAMS[key_to_block]
-
-                # Send Null Array response on timeout: Redis returns "*-1\r\n"
-                response = b"*-1\r\n"
-                # client.sendall(response
-                return response
-
-        # 7. Non-blocking path (no data, no BLOCK keyword) - returns Null Array
-        response = b"*0\r\n"
+    # 4. Main XREAD logic loop (synchronous part - fast path). '$' needs no
+    # resolution round-trip: xread compares parsed (ts, seq) ints directly
+    # and treats '$' as "nothing stored qualifies".
+    stream_data = xread(keys, ids)
+
+    if stream_data:
+        # Non-blocking path: Data is available. Serialize and send immediately.
+        response = _xread_serialize_response(stream_data)
         # client.sendall(response
         return response
 
-    elif command == "INCR":
-        if len(arguments) != 1:
-            return encode_error("wrong number of arguments for 'incr' command")
+    # 5. Blocking path
+    if timeout_ms is not None:
+        # We are blocking: list of entries is empty.
 
-        key = arguments[0]
+        if timeout_ms == 0:
+            # BLOCK 0 means block indefinitely.
+            timeout = None
+        else:
+            # Convert ms to seconds.
+            timeout = timeout_ms / 1000.0
 
-        # Call the atomic helper function
-        new_value, error_message = increment_key_value(key)
+        # Since only one key/id pair is supported in this stage, enforce it for blocking
+        if len(keys) != 1:
+            response = b"-ERR only single key blocking supported in this stage\r\n"
+            # client.sendall(response
+            return response
 
-        if error_message:
-            # Handle error from the helper (WRONGTYPE or not an integer/overflow)
-            # client.sendall(error_message.encode())
-            return error_message.encode()
+        key_to_block = keys[0]
+
+        # Pin '\$' to the current stream tip: for the re-check below it must
+        # mean "entries newer than when the command started", not "newer than
+        # whenever the registration happens to land".
+        last_id = ids[0]
+        if last_id == "$":
+            last_id = get_stream_max_id(key_to_block)
+
+        # Create and register the waiter: a one-shot Event the XADD thread
+        # set()s after writing the response to our socket.
+        client_waiter = threading.Event()
+        client_waiter.client_socket = client
+        client_waiter.key = key_to_block
+        client_waiter.cancelled = False
+
+        with BLOCKING_STREAMS_LOCK:
+            waiters = BLOCKING_STREAMS[key_to_block]
+            waiters.append(client_waiter)
+            # Close the lost-wakeup window: an XADD that ran between the fast
+            # path and this registration found no waiter to notify. Re-check
+            # while still holding the registry lock — XADD appends its entry
+            # before popping a waiter under this same lock, so an entry seen
+            # here can't also be delivered to us by a producer.
+            stream_data = xread([key_to_block], [last_id])
+            if stream_data:
+                waiters.remove(client_waiter)
+                if not waiters:
+                    del BLOCKING_STREAMS[key_to_block]
+                return _xread_serialize_response(stream_data)
+
+        # Wait for notification or timeout (None means block indefinitely).
+        notified = client_waiter.wait(timeout)
+
+        # 6. Post-block handling
+        if notified:
+            # If True, XADD already sent the response.
+            return None
         else:
-            # Success: new_value is an integer. Return RESP Integer.
-            return encode_integer(new_value)
-
-    elif command == "DEL":
-        if not arguments:
-            return encode_error("wrong number of arguments for 'DEL' command")
-        
-        deleted_count = 0
-        for key in arguments:
-            deleted_count += delete_data_entry(key)
-        
-        return encode_integer(deleted_count)
-
-    elif command == "INCRBY":
-        if len(arguments) != 2:
-            return encode_error("wrong number of arguments for 'INCRBY' command")
-        
-        key = arguments[0]
-        try:
-            amount = int(arguments[1])
-        except ValueError:
-            return encode_error("value is not an integer or out of range")
-        
-        new_value, error_msg = increment_key_value_by(key, amount)
-        
-        if error_msg:
-            return error_msg.encode()
-        
+            # Timeout occurred. Flag the registration as cancelled; the next
+            # XADD on this key discards it while popping waiters.
+            with BLOCKING_STREAMS_LOCK:
+                client_waiter.cancelled = True
+
+            # Send Null Array response on timeout: Redis returns "*-1\r\n"
+            response = NULL_ARRAY
+            # client.sendall(response
+            return response
+
+    # 7. Non-blocking path (no data, no BLOCK keyword) - returns Null Array
+    response = RESP_EMPTY_ARRAY
+    # client.sendall(response
+    return response
+
+
+def _cmd_incr(arguments, client):
+    if len(arguments) != 1:
+        return encode_error("wrong number of arguments for 'incr' command")
+
+    key = arguments[0]
+
+    # Call the atomic helper function
+    new_value, error_message = increment_key_value(key)
+
+    if error_message:
+        # Handle error from the helper (WRONGTYPE or not an integer/overflow);
+        # it arrives already RESP-encoded.
+        return error_message
+    else:
+        # Success: new_value is an integer. Return RESP Integer.
         return encode_integer(new_value)
 
 
+def _cmd_del(arguments, client):
+    if not arguments:
+        return encode_error("wrong number of arguments for 'DEL' command")
+    
+    deleted_count = 0
+    for key in arguments:
+        deleted_count += delete_data_entry(key)
+    
+    return encode_integer(deleted_count)
+
+
+def _cmd_incrby(arguments, client):
+    if len(arguments) != 2:
+        return encode_error("wrong number of arguments for 'INCRBY' command")
+    
+    key = arguments[0]
+    try:
+        amount = int(arguments[1])
+    except ValueError:
+        return encode_error("value is not an integer or out of range")
+    
+    new_value, error_msg = increment_key_value_by(key, amount)
+    
+    if error_msg:
+        return error_msg
+    
+    return encode_integer(new_value)
+
+
+def _cmd_quit(arguments, client):
+    return RESP_OK
+
+
+# Dispatch table: command name -> handler. Built once at import with
+# interned keys so dispatch is a single hash lookup on the interned token
+# instead of a linear if/elif scan.
+COMMAND_HANDLERS = {sys.intern(name): handler for name, handler in {
+    "PING": _cmd_ping,
+    "ECHO": _cmd_echo,
+    "SET": _cmd_set,
+    "GET": _cmd_get,
+    "LRANGE": _cmd_lrange,
+    "LPUSH": _cmd_lpush,
+    "LLEN": _cmd_llen,
+    "LPOP": _cmd_lpop,
+    "RPUSH": _cmd_rpush,
+    "BLPOP": _cmd_blpop,
+    "CONFIG": _cmd_config,
+    "KEYS": _cmd_keys,
+    "SUBSCRIBE": _cmd_subscribe,
+    "PUBLISH": _cmd_publish,
+    "UNSUBSCRIBE": _cmd_unsubscribe,
+    "TYPE": _cmd_type,
+    "XADD": _cmd_xadd,
+    "XRANGE": _cmd_xrange,
+    "XREAD": _cmd_xread,
+    "INCR": _cmd_incr,
+    "DEL": _cmd_del,
+    "INCRBY": _cmd_incrby,
+    "QUIT": _cmd_quit,
+}.items()}
+
+# Commands a client may still issue while in subscribed mode.
+ALLOWED_COMMANDS_WHEN_SUBSCRIBED = frozenset(
+    {"SUBSCRIBE", "UNSUBSCRIBE", "PING", "QUIT", "PSUBSCRIBE", "PUNSUBSCRIBE"}
+)
+
+
+def execute_single_command(command: str, arguments: list, client: ClientContext):
+    """
+    Executes a single Redis command and returns the appropriate response.
+    Returns:
+        bytes: RESP-formatted response
+        bool: True for special commands
+    """
+    # One subscribed-state check per command; the PING special case is
+    # answered here so the handler doesn't have to re-query it.
+    if is_client_subscribed(client):
+        if command not in ALLOWED_COMMANDS_WHEN_SUBSCRIBED:
+            return encode_error(f"Can't execute '{command}' when client is subscribed")
+        if command == "PING":
+            return RESP_SUBSCRIBED_PONG
 
-    elif command == "QUIT":
-        return encode_simple_string("OK")
+    handler = COMMAND_HANDLERS.get(command)
+    if handler is None:
+        return encode_error(f"unknown command '{command}'")
+    return handler(arguments, client)
 
-    return encode_error(f"unknown command '{command}'")
 
 
-def handle_command(command: str, arguments: list, client: ClientContext) -> bool:
-    result = execute_single_command(command, arguments, client) # --- COMMAND EXECUTION ---
+# Commands that may park the connection thread. Batched replies must reach the
+# socket before one of these runs, or a producer thread's direct write to this
+# client could overtake them.
+BLOCKING_COMMANDS = frozenset(map(sys.intern, ("BLPOP", "XREAD")))
 
-    if result is None or isinstance(result, bool):
-        return result if isinstance(result, bool) else True
 
-    # --- CLIENT RESPONSE ---
+def _flush_replies(client: ClientContext, reply_buf: bytearray) -> None:
+    """Writes the replies accumulated for the current recv batch in one sendall."""
     try:
-        client.sendall(result)
-        print(f"Sent: Response for command '{command}' to {client.getpeername()}.")
+        client.sendall(reply_buf)
+        log.debug("Sent: %d reply bytes to %s.", len(reply_buf), client.addr)
     except Exception as e:
-        print(f"Connection Error: Failed to send response: {e}")
-
-    return True
+        log.warning("Connection Error: Failed to send response: %s", e)
+    reply_buf.clear()
 
 
 def handle_connection(client: socket.socket, client_address):
@@ -754,36 +926,84 @@ def handle_connection(client: socket.socket, client_address):
     This function is called for each new client connection.
     It manages the connection lifecycle and command loop.
     """
-    print(f"Connection: New connection from {client_address}")
+    log.info("Connection: New connection from %s", client_address)
+
+    # Disable Nagle: replies are small and latency-sensitive, and delayed-ACK
+    # interaction can otherwise stall each one by up to 40ms.
+    try:
+        client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    except OSError:
+        pass  # e.g. AF_UNIX sockets have no TCP level
+    for level, optname, value in server_config.config.socket_options:
+        try:
+            client.setsockopt(level, optname, value)
+        except OSError as e:
+            log.warning("Connection: Could not apply socket option %s: %s", optname, e)
 
     ctx = ClientContext(conn=client, addr=client_address)   # Client context
 
+    # Accumulates bytes across recv calls: a pipelined client can deliver many
+    # commands per syscall, and a large command can span several reads.
+    inbuf = bytearray()
+    recv_view = ctx.recv_view
+
     with ctx:
         while True:
-            # The thread waits for the client to send a command. When you run {redis-cli ECHO hey}, the server receives the raw RESP bytes: data = b'*2\r\n$4\r\nECHO\r\n$3\r\nhey\r\n'
+            # The thread waits for the client to send a command. When you run {redis-cli ECHO hey},
+            # the server receives the raw RESP bytes: data = b'*2\r\n$4\r\nECHO\r\n$3\r\nhey\r\n'
             try:
-                data = client.recv(4096)
+                n = client.recv_into(recv_view)
             except OSError:
                 break
 
-            if not data:
-                print(f"Connection: Client {client_address} closed connection.")
+            if not n:
+                log.info("Connection: Client %s closed connection.", client_address)
                 cleanup_blocked_client(ctx)
                 break
 
-            print(f"Received: Raw bytes from {client_address}: {data!r}")
+            inbuf += recv_view[:n]
+            log.debug("Received: %d raw bytes from %s", n, client_address)
 
-            # The raw bytes are immediately sent to the parser to be translated into a usable Python list.
-            parsed_command = parse_resp_array(data)
-
-            if not parsed_command:
-                print(f"Received: Could not parse command from {client_address}. Closing connection.")
+            # Drain every complete command from the buffer before the next
+            # recv, batching replies so a pipelined batch costs one sendall.
+            offset = 0
+            parse_error = False
+            reply_buf = bytearray()
+            while True:
+                try:
+                    parsed_command, offset = parse_resp_command(inbuf, offset)
+                except ValueError:
+                    log.warning("Received: Could not parse command from %s. Closing connection.", client_address)
+                    parse_error = True
+                    break
+
+                if parsed_command is None:
+                    break  # incomplete frame: keep the tail for the next recv
+                if not parsed_command:
+                    continue  # empty array (*0\r\n) carries no command
+
+                # Intern the token once so every subsequent set/dict lookup on it
+                # short-circuits on pointer equality.
+                command = sys.intern(parsed_command[0].upper())
+                arguments = parsed_command[1:]
+
+                log.debug("Command: Parsed command: %s, Arguments: %s", command, arguments)
+
+                # Keep replies in client order: flush the batch before a
+                # command that may block and have its reply written by a
+                # producer thread.
+                if reply_buf and command in BLOCKING_COMMANDS:
+                    _flush_replies(ctx, reply_buf)
+
+                result = execute_single_command(command, arguments, ctx)
+                # True/None means the command handled its own I/O (blocking
+                # paths); everything else is a RESP reply to batch.
+                if result is not None and result is not True:
+                    reply_buf += result
+
+            if reply_buf:
+                _flush_replies(ctx, reply_buf)
+            if parse_error:
                 break
-
-            command = parsed_command[0].upper()
-            arguments = parsed_command[1:]
-
-            print(f"Command: Parsed command: {command}, Arguments: {arguments}")
-
-            # Delegate command execution to the router
-            handle_command(command, arguments, ctx)
\ No newline at end of file
+            if offset:
+                del inbuf[:offset]
\ No newline at end of file
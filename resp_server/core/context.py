@@ -6,7 +6,15 @@ class ClientContext:
     conn: socket.socket
     addr: tuple
     is_subscribed: bool = False
-    
+    # Reusable 64 KB scratch buffer for recv_into, so pipelined commands land
+    # in one syscall without allocating a fresh bytes object per read. The
+    # memoryview is created once here and reused for every recv.
+    recv_buf: bytearray = field(default_factory=lambda: bytearray(65536))
+    recv_view: memoryview = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.recv_view = memoryview(self.recv_buf)
+
     def sendall(self, data: bytes):
         """Proxy to socket.sendall"""
         self.conn.sendall(data)
@@ -5,8 +5,12 @@ This module provides the core data storage logic, delegating parsing and validat
 to the centralized helpers module.
 """
 
+import sys
 import threading
-import time
+from array import array
+from bisect import bisect_left
+from collections import defaultdict, deque
+from itertools import islice
 from typing import Optional, Union
 
 from resp_server.core import helpers
@@ -19,49 +23,150 @@ from resp_server.protocol.resp import encode_error
 DATA_LOCK = threading.Lock()
 BLOCKING_CLIENTS_LOCK = threading.Lock()
 BLOCKING_STREAMS_LOCK = threading.Lock()
+# Pub/sub registries are disjoint from the blocking wait queues; giving them
+# their own lock keeps SUBSCRIBE/PUBLISH traffic from contending with
+# BLPOP registration.
+PUBSUB_LOCK = threading.Lock()
+
+# Striped locks for single-key operations, including streams. Independent
+# keys hash to different stripes, so concurrent clients working on disjoint
+# keys no longer serialize on one global mutex. DATA_LOCK remains only for
+# store-wide work (KEYS snapshots). Individual dict operations are atomic
+# under the GIL; the stripe lock makes multi-step read-modify-write sequences
+# atomic per key. Stripe locks are never nested, so acquisition order can't
+# deadlock.
+_NUM_STRIPES = 64
+_KEY_LOCKS = tuple(threading.Lock() for _ in range(_NUM_STRIPES))
+
+def _lock_for(key: str) -> threading.Lock:
+    return _KEY_LOCKS[hash(key) & (_NUM_STRIPES - 1)]
 
 # ============================================================================
 # DATA STORAGE
 # ============================================================================
 
-DATA_STORE = {}           # Key -> {'type', 'value', 'expiry'}
-STREAMS = {}              # Key -> List[Entry]
-CHANNEL_SUBSCRIBERS = {}  # Channel -> Set[Client]
-CLIENT_SUBSCRIPTIONS = {} # Client -> Set[Channel]
-CLIENT_STATE = {}         # Client -> Dict[State]
-BLOCKING_CLIENTS = {}     # Key -> List[Condition]
-BLOCKING_STREAMS = {}     # Key -> List[Condition]
+DATA_STORE = {}           # Key -> Entry
+STREAMS = {}              # Key -> Stream
+CHANNEL_SUBSCRIBERS = defaultdict(set)  # Channel -> Set[Client]
+CLIENT_SUBSCRIPTIONS = defaultdict(set) # Client -> Set[Channel]
+CLIENT_STATE = {}         # Client -> ClientState
+# Waiter FIFOs for BLPOP and XREAD BLOCK. Deques give O(1) popleft; a waiter
+# that times out marks itself `cancelled` instead of scanning the deque to
+# remove itself, and producers skip cancelled waiters when popping.
+BLOCKING_CLIENTS = defaultdict(deque)  # Key -> Deque[waiter]
+BLOCKING_STREAMS = defaultdict(deque)  # Key -> Deque[waiter]
+
+# ============================================================================
+# ENTRY REPRESENTATION
+# ============================================================================
+
+# Type tags, interned explicitly so `is` comparisons against them hold even
+# for tag strings that arrive from outside this module (e.g. an RDB loader
+# that materializes them at runtime).
+TYPE_STRING = sys.intern("string")
+TYPE_LIST = sys.intern("list")
+TYPE_STREAM = sys.intern("stream")
+
+class Entry:
+    """One stored value.
+
+    Slotted instead of the previous {'type','value','expiry'} dict: attribute
+    access replaces three hash lookups per read, and per-key overhead drops
+    from a full PyDict to a fixed-slot object.
+
+    is_int marks string entries whose value is held as a native int (the
+    analogue of Redis's int encoding): INCR then works on the int directly
+    and the decimal string is only materialized when a reply needs it.
+    """
+    __slots__ = ("type", "value", "expiry", "is_int")
+
+    def __init__(self, type_str: str, value, expiry: Optional[int], is_int: bool = False):
+        self.type = type_str
+        self.value = value
+        self.expiry = expiry
+        self.is_int = is_int
+
+class Stream:
+    """Columnar (structure-of-arrays) storage for one stream.
+
+    IDs live in parallel signed-64 arrays of timestamp and sequence rather
+    than as a "ts-seq" string per entry: range lookups binary-search the
+    timestamp array and compare native ints, and id storage drops from a
+    Python string per entry to 16 packed bytes. field_keys/field_values hold
+    the per-entry encoded field lists, parallel to the id arrays.
+    """
+    __slots__ = ("ts", "seq", "field_keys", "field_values")
+
+    def __init__(self):
+        self.ts = array("q")
+        self.seq = array("q")
+        self.field_keys = []
+        self.field_values = []
+
+class ClientState:
+    """Per-client connection state.
+
+    Slotted for the same reason as Entry: is_client_subscribed runs in the
+    command dispatch gate on every command, and an attribute load beats the
+    get-chain over a per-client dict (which also allocated a throwaway empty
+    dict for clients with no state).
+    """
+    __slots__ = ("is_subscribed",)
+
+    def __init__(self):
+        self.is_subscribed = False
+
+EMPTY_SET = frozenset()
+
+_MAX_SEQ = (1 << 63) - 1
+
+def _parse_stream_id(id_str: str, default_seq: int = 0) -> tuple[int, int]:
+    """Parses a 'ts-seq' (or bare 'ts') stream ID into an (int, int) pair."""
+    ts_part, dash, seq_part = id_str.partition("-")
+    return int(ts_part), int(seq_part) if dash else default_seq
+
+def _stream_search(stream: "Stream", ts: int, seq: int) -> int:
+    """Index of the first entry with ID >= (ts, seq).
+
+    Binary search on the timestamp array, then a linear walk over the (rare)
+    run of entries sharing that timestamp — O(log N + ties) instead of the
+    O(N) scan with a string-parsing compare per entry.
+    """
+    ts_arr, seq_arr = stream.ts, stream.seq
+    i = bisect_left(ts_arr, ts)
+    n = len(ts_arr)
+    while i < n and ts_arr[i] == ts and seq_arr[i] < seq:
+        i += 1
+    return i
 
 # ============================================================================
 # INTERNAL WRAPPERS
 # ============================================================================
 
-def _get_entry(key: str, expected_type: str = None) -> Optional[dict]:
+def _get_entry(key: str, expected_type: str = None) -> Optional["Entry"]:
     """Retrieves an entry using the central helper, passing the global store."""
     return helpers.get_valid_entry(key, DATA_STORE, STREAMS, expected_type)
 
-def _set_entry(key: str, value, type_str: str, expiry: Optional[int]):
-    DATA_STORE[key] = {"type": type_str, "value": value, "expiry": expiry}
-
-def _list_push(key: str, element: str, prepend: bool = False):
-    entry = _get_entry(key, "list")
-    if entry:
-        entry["value"].insert(0, element) if prepend else entry["value"].append(element)
+def _set_entry(key: str, value, type_str: str, expiry: Optional[int], is_int: bool = False):
+    DATA_STORE[key] = Entry(type_str, value, expiry, is_int)
 
-def _get_pubsub_set(key, container):
-    if key not in container: container[key] = set()
-    return container[key]
+def _list_push(key: str, element: str, prepend: bool = False) -> int:
+    entry = _get_entry(key, TYPE_LIST)
+    if entry is None:
+        return 0
+    entry.value.appendleft(element) if prepend else entry.value.append(element)
+    return len(entry.value)
 
 # ============================================================================
 # PUBLIC API - KEY-VALUE OPERATIONS
 # ============================================================================
 
-def get_data_entry(key: str) -> Optional[dict]:
-    with DATA_LOCK:
+def get_data_entry(key: str) -> Optional["Entry"]:
+    with _lock_for(key):
         return _get_entry(key)
 
 def delete_data_entry(key: str) -> int:
-    with DATA_LOCK:
+    with _lock_for(key):
         if key in DATA_STORE:
             del DATA_STORE[key]
             if key in STREAMS: del STREAMS[key]
@@ -69,49 +174,68 @@ def delete_data_entry(key: str) -> int:
         return 0
 
 def set_string(key: str, value: str, expiry_timestamp: Optional[int]):
-    with DATA_LOCK:
-        _set_entry(key, value, "string", expiry_timestamp)
+    with _lock_for(key):
+        # Store canonical integer strings as native ints so INCR skips the
+        # parse/format round-trip. The canonical-form check keeps values like
+        # "0123" or " 5" as strings — GET must return them byte-identical.
+        try:
+            as_int = int(value)
+        except ValueError:
+            as_int = None
+        if as_int is not None and str(as_int) == value:
+            _set_entry(key, as_int, TYPE_STRING, expiry_timestamp, is_int=True)
+        else:
+            _set_entry(key, value, TYPE_STRING, expiry_timestamp)
 
-def set_list(key: str, elements: list[str], expiry_timestamp: Optional[int]):
-    with DATA_LOCK:
-        _set_entry(key, elements, "list", expiry_timestamp)
+def set_list(key: str, elements: list[str], expiry_timestamp: Optional[int]) -> int:
+    # Lists are stored as deques: appendleft/popleft are O(1) where a list
+    # pays an O(N) shift for every head insert or pop.
+    with _lock_for(key):
+        _set_entry(key, deque(elements), TYPE_LIST, expiry_timestamp)
+        return len(elements)
 
 def existing_list(key: str) -> bool:
-    with DATA_LOCK:
-        return _get_entry(key, "list") is not None
+    with _lock_for(key):
+        return _get_entry(key, TYPE_LIST) is not None
 
-def append_to_list(key: str, element: str):
-    with DATA_LOCK:
-        _list_push(key, element, prepend=False)
+def append_to_list(key: str, element: str) -> int:
+    """Appends and returns the new list size (0 if the key is not a list)."""
+    with _lock_for(key):
+        return _list_push(key, element, prepend=False)
 
-def prepend_to_list(key: str, element: str):
-    with DATA_LOCK:
-        _list_push(key, element, prepend=True)
+def prepend_to_list(key: str, element: str) -> int:
+    """Prepends and returns the new list size (0 if the key is not a list)."""
+    with _lock_for(key):
+        return _list_push(key, element, prepend=True)
 
 def size_of_list(key: str) -> int:
-    with DATA_LOCK:
-        entry = _get_entry(key, "list")
-        return len(entry["value"]) if entry else 0
+    with _lock_for(key):
+        entry = _get_entry(key, TYPE_LIST)
+        return len(entry.value) if entry else 0
 
 def lrange_rtn(key: str, start: int, end: int) -> list[str]:
-    with DATA_LOCK:
-        entry = _get_entry(key, "list")
+    with _lock_for(key):
+        entry = _get_entry(key, TYPE_LIST)
         if not entry: return []
-        lst = entry["value"]
+        lst = entry.value
         L = len(lst)
         # Handle negative indices
         if start < 0: start += L
         if end < 0: end += L
         start = max(0, start)
         if start > end or start >= L: return []
-        return lst[start:min(end + 1, L)]
+        # LRANGE 0 -1 dominates; a whole-deque copy skips the islice walk.
+        if start == 0 and end + 1 >= L:
+            return list(lst)
+        return list(islice(lst, start, min(end + 1, L)))
 
 def remove_elements_from_list(key: str, count: int) -> Optional[list[str]]:
-    with DATA_LOCK:
-        entry = _get_entry(key, "list")
-        if entry and entry["value"]:
-            popped = [entry["value"].pop(0) for _ in range(min(count, len(entry["value"])))]
-            if not entry["value"]: del DATA_STORE[key]
+    with _lock_for(key):
+        entry = _get_entry(key, TYPE_LIST)
+        if entry and entry.value:
+            values = entry.value
+            popped = [values.popleft() for _ in range(min(count, len(values)))]
+            if not values: del DATA_STORE[key]
             return popped
     return None
 
@@ -122,38 +246,46 @@ def increment_key_value_by(key: str, amount: int) -> tuple[Optional[int], Option
     return _incr_generic(key, amount)
 
 def _incr_generic(key: str, amount: int) -> tuple[Optional[int], Optional[bytes]]:
-    with DATA_LOCK:
+    with _lock_for(key):
         entry = DATA_STORE.get(key)
         # Check expiry manually since we handle non-existence differently
         if entry and helpers.check_expiry(key, entry, DATA_STORE):
             entry = None
 
         if entry is None:
-            _set_entry(key, str(amount), "string", None)
+            _set_entry(key, amount, TYPE_STRING, None, is_int=True)
             return amount, None
         
-        if entry.get("type") != "string":
+        if entry.type is not TYPE_STRING:
             return None, encode_error("WRONGTYPE Operation against a key holding the wrong kind of value")
         
+        if entry.is_int:
+            entry.value += amount
+            return entry.value, None
         try:
-            new_val = int(entry["value"]) + amount
-            entry["value"] = str(new_val)
-            return new_val, None
+            new_val = int(entry.value) + amount
         except ValueError:
             return None, encode_error("value is not an integer or out of range")
+        # Parsed once; keep it as an int from here on.
+        entry.value = new_val
+        entry.is_int = True
+        return new_val, None
 
 # ============================================================================
 # PUBLIC API - PUB/SUB
 # ============================================================================
 
 def subscribe(client, channel):
-    with BLOCKING_CLIENTS_LOCK:
-        _get_pubsub_set(channel, CHANNEL_SUBSCRIBERS).add(client)
-        _get_pubsub_set(client, CLIENT_SUBSCRIPTIONS).add(channel)
-        CLIENT_STATE.setdefault(client, {})["is_subscribed"] = True
+    with PUBSUB_LOCK:
+        CHANNEL_SUBSCRIBERS[channel].add(client)
+        CLIENT_SUBSCRIPTIONS[client].add(channel)
+        state = CLIENT_STATE.get(client)
+        if state is None:
+            state = CLIENT_STATE[client] = ClientState()
+        state.is_subscribed = True
 
 def unsubscribe(client, channel):
-    with BLOCKING_CLIENTS_LOCK:
+    with PUBSUB_LOCK:
         if channel in CHANNEL_SUBSCRIBERS:
             CHANNEL_SUBSCRIBERS[channel].discard(client)
             if not CHANNEL_SUBSCRIBERS[channel]: del CHANNEL_SUBSCRIBERS[channel]
@@ -162,22 +294,28 @@ def unsubscribe(client, channel):
             CLIENT_SUBSCRIPTIONS[client].discard(channel)
             if not CLIENT_SUBSCRIPTIONS[client]: del CLIENT_SUBSCRIPTIONS[client]
             
-        if client in CLIENT_STATE:
-            CLIENT_STATE[client]["is_subscribed"] = bool(CLIENT_SUBSCRIPTIONS.get(client))
+        state = CLIENT_STATE.get(client)
+        if state is not None:
+            state.is_subscribed = bool(CLIENT_SUBSCRIPTIONS.get(client))
 
 def num_client_subscriptions(client) -> int:
-    with BLOCKING_CLIENTS_LOCK:
-        return len(CLIENT_SUBSCRIPTIONS.get(client, []))
+    with PUBSUB_LOCK:
+        return len(CLIENT_SUBSCRIPTIONS.get(client, EMPTY_SET))
 
 def is_client_subscribed(client) -> bool:
-    with BLOCKING_CLIENTS_LOCK:
-        return CLIENT_STATE.get(client, {}).get("is_subscribed", False)
+    with PUBSUB_LOCK:
+        state = CLIENT_STATE.get(client)
+        return state.is_subscribed if state is not None else False
 
 def cleanup_blocked_client(client):
-    with BLOCKING_CLIENTS_LOCK:
-        for channel, subs in list(CHANNEL_SUBSCRIBERS.items()):
-            subs.discard(client)
-            if not subs: del CHANNEL_SUBSCRIBERS[channel]
+    with PUBSUB_LOCK:
+        # CLIENT_SUBSCRIPTIONS is the reverse index: walk only the channels
+        # this client actually joined instead of scanning every channel.
+        for channel in CLIENT_SUBSCRIPTIONS.get(client, ()):
+            subs = CHANNEL_SUBSCRIBERS.get(channel)
+            if subs is not None:
+                subs.discard(client)
+                if not subs: del CHANNEL_SUBSCRIBERS[channel]
         if client in CLIENT_SUBSCRIPTIONS: del CLIENT_SUBSCRIPTIONS[client]
         if client in CLIENT_STATE: del CLIENT_STATE[client]
 
@@ -186,113 +324,184 @@ def cleanup_blocked_client(client):
 # ============================================================================
 
 def get_stream_max_id(key: str) -> str:
-    with DATA_LOCK:
-        return STREAMS[key][-1]["id"] if key in STREAMS and STREAMS[key] else "0-0"
+    with _lock_for(key):
+        stream = STREAMS.get(key)
+        return f"{stream.ts[-1]}-{stream.seq[-1]}" if stream and stream.ts else "0-0"
+
+def get_last_stream_entry(key: str) -> Optional[tuple]:
+    """Returns (id_str, field_keys, field_values) for the newest entry of a
+    stream, or None if it is empty/missing."""
+    with _lock_for(key):
+        stream = STREAMS.get(key)
+        if not stream or not stream.ts:
+            return None
+        return (f"{stream.ts[-1]}-{stream.seq[-1]}",
+                stream.field_keys[-1], stream.field_values[-1])
 
 def xadd(key: str, id_str: str, fields: dict) -> Union[bytes, str]:
-    with DATA_LOCK:
-        if key not in STREAMS:
-            STREAMS[key] = []
-            _set_entry(key, None, "stream", None)
-        
-        entries = STREAMS[key]
-        last_id = entries[-1]["id"] if entries else "0-0"
-        
-        # ID Generation / Validation
+    # Encode field names and values to bytes once at write time; reads then
+    # copy them straight into the RESP reply without re-encoding per XREAD.
+    # Stored as parallel lists so readers iterate without dict machinery.
+    field_keys = [f.encode() for f in fields]
+    field_values = [v.encode() for v in fields.values()]
+    with _lock_for(key):
+        stream = STREAMS.get(key)
+        if stream is None:
+            stream = STREAMS[key] = Stream()
+            _set_entry(key, None, TYPE_STREAM, None)
+
+        ts_arr = stream.ts
+        if ts_arr:
+            last_ts, last_seq = ts_arr[-1], stream.seq[-1]
+        else:
+            last_ts, last_seq = 0, 0
+
+        # ID Generation / Validation — all on native ints, no string compares.
         if id_str == "*":
-            ts = int(time.time() * 1000)
-            last_ts, last_seq = map(int, last_id.split('-'))
+            ts = helpers.now_ms()
             if ts > last_ts: seq = 0
             else: ts, seq = last_ts, last_seq + 1
-            final_id = f"{ts}-{seq}"
         elif id_str.endswith("-*"):
-            ts = int(id_str.split('-')[0])
-            last_ts, last_seq = map(int, last_id.split('-'))
+            ts = int(id_str[:-2])
             if ts > last_ts: seq = 0
             elif ts == last_ts: seq = last_seq + 1
             else: return encode_error("The ID specified in XADD is equal or smaller than the target stream top item")
-            final_id = f"{ts}-{seq}"
         else:
-            if helpers.compare_stream_ids(id_str, last_id) <= 0 and last_id != "0-0":
+            try:
+                ts, seq = _parse_stream_id(id_str)
+            except ValueError:
+                return encode_error("Invalid stream ID specified as stream command argument")
+            if ts_arr and (ts, seq) <= (last_ts, last_seq):
                 return encode_error("The ID specified in XADD is equal or smaller than the target stream top item")
-            if id_str == "0-0": return encode_error("The ID specified in XADD must be greater than 0-0")
-            final_id = id_str
-        
-        entries.append({"id": final_id, "fields": fields})
-        return final_id
+            if ts == 0 and seq == 0: return encode_error("The ID specified in XADD must be greater than 0-0")
+
+        ts_arr.append(ts)
+        stream.seq.append(seq)
+        stream.field_keys.append(field_keys)
+        stream.field_values.append(field_values)
+        return f"{ts}-{seq}"
 
 def xrange(key: str, start: str, end: str) -> list:
-    with DATA_LOCK:
-        if key not in STREAMS: return []
+    """Returns [(id_str, field_keys, field_values), ...] for the ID range.
+
+    Both bounds are inclusive; a bare timestamp means sequence 0 at the start
+    and the maximum sequence at the end, per the protocol. Bounds are found
+    by binary search, so the scan touches only the matching entries.
+    """
+    with _lock_for(key):
+        stream = STREAMS.get(key)
+        if stream is None: return []
+        ts_arr, seq_arr = stream.ts, stream.seq
+        n = len(ts_arr)
+        try:
+            lo = 0 if start == "-" else _stream_search(stream, *_parse_stream_id(start))
+            if end == "+":
+                hi = n
+            else:
+                end_ts, end_seq = _parse_stream_id(end, _MAX_SEQ)
+                hi = _stream_search(stream, end_ts, end_seq + 1)
+        except ValueError:
+            return []
         return [
-            entry for entry in STREAMS[key]
-            if (start == "-" or helpers.compare_stream_ids(entry["id"], start) >= 0) and
-               (end == "+" or helpers.compare_stream_ids(entry["id"], end) <= 0)
+            (f"{ts_arr[i]}-{seq_arr[i]}", stream.field_keys[i], stream.field_values[i])
+            for i in range(lo, hi)
         ]
 
 def xread(keys: list, last_ids: list) -> dict:
-    with DATA_LOCK:
-        res = {}
-        for stream_key, last_id in zip(keys, last_ids):
-            if stream_key not in STREAMS: continue
-            if last_id == "$": last_id = get_stream_max_id(stream_key)
-            
-            matches = [
-                e for e in STREAMS[stream_key]
-                if helpers.compare_stream_ids(e["id"], last_id) > 0
-            ]
-            if matches: res[stream_key] = matches
-        return res
+    """Returns matches per stream key in columnar (SoA) form.
+
+    Each value is a tuple (ids, field_names, field_values) of parallel lists —
+    one slot per matching entry — instead of a list of per-entry dicts. The
+    serializer walks the parallel lists directly, and identical consecutive
+    field-name lists are shared by reference since entries of a stream almost
+    always carry the same fields.
+    """
+    res = {}
+    for stream_key, last_id in zip(keys, last_ids):
+        with _lock_for(stream_key):
+            stream = STREAMS.get(stream_key)
+            if stream is None: continue
+            # '$' means "only entries newer than now" — by definition nothing
+            # already stored qualifies.
+            if last_id == "$": continue
+            ts_arr = stream.ts
+            if not ts_arr: continue
+            try:
+                ts, seq = _parse_stream_id(last_id)
+            except ValueError:
+                continue
+            # First entry strictly greater than (ts, seq), by binary search.
+            lo = _stream_search(stream, ts, seq + 1)
+            n = len(ts_arr)
+            if lo >= n: continue
+            seq_arr = stream.seq
+            ids = [f"{ts_arr[i]}-{seq_arr[i]}" for i in range(lo, n)]
+            res[stream_key] = (ids, stream.field_keys[lo:], stream.field_values[lo:])
+    return res
 
 # ============================================================================
 # RDB LOADING
 # ============================================================================
 
-def load_rdb_to_datastore(path: str) -> dict:
-    import os
-    if not os.path.exists(path): return {}
-    
+def _rdb_skip_aux(buf: bytes, off: int, new_store: dict) -> int:
+    """0xFA: auxiliary field — skip the key/value string pair."""
+    _, off = helpers.read_rdb_string(buf, off)
+    _, off = helpers.read_rdb_string(buf, off)
+    return off
+
+def _rdb_load_db(buf: bytes, off: int, new_store: dict) -> int:
+    """0xFE: DB selector — loads the database's key/value records."""
+    _, off = helpers.read_rdb_length(buf, off) # db_index
+    if buf[off] == 0xFB: # Resize DB
+        _, off = helpers.read_rdb_length(buf, off + 1)
+        _, off = helpers.read_rdb_length(buf, off)
+
+    end = len(buf)
+    while off < end:
+        expiry_time = None
+        type_byte = buf[off]
+        if type_byte == 0xFF: # EOF (left for the outer loop to consume)
+            break
+        off += 1
+
+        if type_byte == 0xFC or type_byte == 0xFD: # Expiry
+            expiry_time, off = helpers.read_rdb_expiry(buf, off, type_byte)
+            type_byte = buf[off]
+            off += 1
+
+        key_str, off = helpers.read_rdb_string(buf, off)
+        val_obj, off = helpers.read_rdb_value(buf, off, type_byte)
+
+        if type_byte == 0x00: # String
+            new_store[key_str] = Entry(TYPE_STRING, val_obj, expiry_time)
+    return off
+
+_RDB_OPCODES = {0xFA: _rdb_skip_aux, 0xFE: _rdb_load_db}
+
+def load_rdb_to_datastore(buf) -> dict:
+    """Parses an in-memory RDB image into a fresh store dict.
+
+    `buf` is anything indexable and sliceable — bytes, bytearray, or the
+    read-only mmap initialize_datastore sets up. Parsing advances an integer
+    offset over the buffer in place, so an mmap'd file is walked through the
+    page cache without ever materializing a heap copy, and there is no
+    per-byte read() call in the parse loop.
+    """
     new_store = {}
     try:
-        with open(path, "rb") as rdb_file:
-            if rdb_file.read(5) != b"REDIS": return {}
-            rdb_file.read(4) # skip version
-            
-            while True:
-                op_code = rdb_file.read(1)
-                if not op_code: break
-                
-                if op_code == b'\xFA': # Auxiliary fields
-                    helpers.read_rdb_string(rdb_file)
-                    helpers.read_rdb_string(rdb_file)
-                    
-                elif op_code == b'\xFE': # DB Selector
-                    helpers.read_rdb_length(rdb_file) # db_index
-                    if rdb_file.read(1) == b'\xFB': # Resize DB
-                        helpers.read_rdb_length(rdb_file)
-                        helpers.read_rdb_length(rdb_file)
-                    else:
-                        rdb_file.seek(-1, 1) # Backtrack
-                        
-                    while True:
-                        expiry_time = None
-                        type_byte = rdb_file.read(1)
-                        if not type_byte or type_byte == b'\xFF': # EOF
-                            break
-                            
-                        if type_byte in (b'\xFC', b'\xFD'): # Expiry
-                            expiry_time = helpers.read_rdb_expiry(rdb_file, type_byte)
-                            type_byte = rdb_file.read(1)
-                            
-                        key_str = helpers.read_rdb_string(rdb_file)
-                        val_obj = helpers.read_rdb_value(rdb_file, type_byte)
-                        
-                        if type_byte == b'\x00': # String
-                            new_store[key_str] = {"type": "string", "value": val_obj, "expiry": expiry_time}
-                            
-                elif op_code == b'\xFF': # End of RDB
-                    break
+        if buf[:5] != b"REDIS": return {}
+        off = 9 # magic + 4-byte version
+        end = len(buf)
+
+        while off < end:
+            op_code = buf[off]
+            off += 1
+            if op_code == 0xFF: # End of RDB
+                break
+            handler = _RDB_OPCODES.get(op_code)
+            if handler is None: break
+            off = handler(buf, off, new_store)
     except Exception:
         pass # Best effort loading
-        
+
     return new_store
\ No newline at end of file
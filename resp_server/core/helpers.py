@@ -1,96 +1,130 @@
 """
 Centralized helper functions for RESP Server core logic.
-Handles RDB parsing primitives, Stream ID comparison, and common data entry validation.
+Handles RDB parsing primitives, the cached clock, and common data entry validation.
 """
 
+import struct
+import threading
 import time
 from typing import Optional
 
-def compare_stream_ids(id1: str, id2: str) -> int:
-    """
-    Compares two stream IDs formatted as 'timestamp-sequence'.
-    Returns:
-        1 if id1 > id2
-        -1 if id1 < id2
-        0 if id1 == id2
-    """
-    try:
-        t1, s1 = map(int, id1.split('-'))
-        t2, s2 = map(int, id2.split('-'))
-        if t1 != t2: return 1 if t1 > t2 else -1
-        if s1 != s2: return 1 if s1 > s2 else -1
-        return 0
-    except (ValueError, AttributeError):
-        return 0
+# ============================================================================
+# CACHED MILLISECOND CLOCK
+# ============================================================================
+
+# Wall-clock milliseconds, refreshed by a daemon ticker thread. Expiry checks
+# run on every read, so they consume this cached value instead of paying the
+# clock syscall per operation; 1 ms of staleness is far below the timing
+# granularity anything in the protocol promises.
+_NOW_MS = time.time_ns() // 1_000_000
+_CLOCK_STARTED = False
+_CLOCK_LOCK = threading.Lock()
+
+def _clock_tick():
+    global _NOW_MS
+    time_ns = time.time_ns
+    sleep = time.sleep
+    while True:
+        _NOW_MS = time_ns() // 1_000_000
+        sleep(0.001)
+
+def start_clock():
+    """Starts the millisecond ticker thread. Idempotent."""
+    global _CLOCK_STARTED
+    with _CLOCK_LOCK:
+        if not _CLOCK_STARTED:
+            threading.Thread(target=_clock_tick, name="resp-clock", daemon=True).start()
+            _CLOCK_STARTED = True
+
+def now_ms() -> int:
+    """Current wall-clock time in milliseconds, read from the ticker cache."""
+    if not _CLOCK_STARTED:
+        # Embedded callers that never go through Server.start(): spin the
+        # ticker up on first use, answering this call with a live reading.
+        start_clock()
+        return time.time_ns() // 1_000_000
+    return _NOW_MS
 
 # ============================================================================
 # RDB PARSING HELPERS
 # ============================================================================
 
-def read_rdb_length(rdb_file):
-    """Reads a length encoding from the RDB file stream."""
-    first_byte = rdb_file.read(1)[0]
+# Precompiled Struct readers for the fixed-width integers in the format:
+# unpack_from decodes straight out of the buffer in one C call, where
+# int.from_bytes needs an intermediate slice allocation first.
+_U32BE = struct.Struct(">I").unpack_from
+_U32LE = struct.Struct("<I").unpack_from
+_U64LE = struct.Struct("<Q").unpack_from
+
+# The parsers below work over one bytes buffer with an explicit offset and
+# return (value, new_offset). The previous file-object versions issued a
+# read(1) per opcode/length byte — a Python/C boundary crossing and a bytes
+# allocation each — where indexing the preloaded buffer is a plain int.
+
+def read_rdb_length(buf: bytes, off: int):
+    """Reads a length encoding. Returns (length, new_off)."""
+    first_byte = buf[off]
     prefix = first_byte >> 6
     if prefix == 0b00:
-        return first_byte & 0x3F
+        return first_byte & 0x3F, off + 1
     elif prefix == 0b01:
-        return ((first_byte & 0x3F) << 8) | rdb_file.read(1)[0]
+        return ((first_byte & 0x3F) << 8) | buf[off + 1], off + 2
     elif prefix == 0b10:
-        return int.from_bytes(rdb_file.read(4), "big")
+        return _U32BE(buf, off + 1)[0], off + 5
     else:
-        return first_byte
+        return first_byte, off + 1
 
-def read_rdb_encoded_string(rdb_file, first_byte):
-    """Reads an integer-encoded string."""
+def read_rdb_encoded_string(buf: bytes, off: int, first_byte: int):
+    """Reads an integer-encoded string. Returns (string, new_off)."""
     encoding_type = first_byte & 0x3F
     if encoding_type == 0x00:
-        return str(int.from_bytes(rdb_file.read(1), "big"))
+        return str(buf[off]), off + 1
     elif encoding_type == 0x01:
-        return str(int.from_bytes(rdb_file.read(2), "little"))
+        return str(int.from_bytes(buf[off:off + 2], "little")), off + 2
     elif encoding_type == 0x02:
-        return str(int.from_bytes(rdb_file.read(4), "little"))
-    return None
+        return str(_U32LE(buf, off)[0]), off + 4
+    return None, off
 
-def read_rdb_string(rdb_file):
-    """Reads a string (prefixed by length) from the RDB file stream."""
-    length_or_encoding_byte = read_rdb_length(rdb_file)
+def read_rdb_string(buf: bytes, off: int):
+    """Reads a length-prefixed string. Returns (string, new_off)."""
+    first_byte = buf[off]
     # Check for special encoding
-    if (length_or_encoding_byte >> 6) == 0b11:
-        return read_rdb_encoded_string(rdb_file, length_or_encoding_byte)
-    
-    length = length_or_encoding_byte
-    data = rdb_file.read(length)
+    if (first_byte >> 6) == 0b11:
+        return read_rdb_encoded_string(buf, off + 1, first_byte)
+
+    length, off = read_rdb_length(buf, off)
+    data = buf[off:off + length]
     try:
-        return data.decode("utf-8")
+        return data.decode("utf-8"), off + length
     except UnicodeDecodeError:
-        return data
+        return data, off + length
 
-def read_rdb_value(rdb_file, value_type_byte):
-    """Reads a value based on its type byte."""
+def read_rdb_value(buf: bytes, off: int, value_type_byte: int):
+    """Reads a value based on its type byte. Returns (value, new_off)."""
     # 0 = String Encoding
-    if value_type_byte == b'\x00':
-        return read_rdb_string(rdb_file)
-    return None
-
-def read_rdb_expiry(rdb_file, type_byte):
-    """Reads expiry timestamp based on type (ms or seconds)."""
-    if type_byte == b'\xFC': # Milliseconds
-        return int.from_bytes(rdb_file.read(8), "little")
-    elif type_byte == b'\xFD': # Seconds
-        return int.from_bytes(rdb_file.read(4), "little") * 1000
-    return None
+    if value_type_byte == 0x00:
+        return read_rdb_string(buf, off)
+    return None, off
+
+def read_rdb_expiry(buf: bytes, off: int, type_byte: int):
+    """Reads an expiry timestamp (ms or seconds). Returns (ms, new_off)."""
+    if type_byte == 0xFC: # Milliseconds
+        return _U64LE(buf, off)[0], off + 8
+    elif type_byte == 0xFD: # Seconds
+        return _U32LE(buf, off)[0] * 1000, off + 4
+    return None, off
 
 # ============================================================================
 # DATA ENTRY HELPERS
 # ============================================================================
 
-def check_expiry(key: str, entry: dict, store: dict, side_store: dict = None) -> bool:
+def check_expiry(key: str, entry, store: dict, side_store: dict = None) -> bool:
     """
     Checks if an entry has expired. 
     If expired, deletes it from `store` (and optional `side_store`) and returns True.
     """
-    expiry = entry.get("expiry")
-    if expiry is not None and int(time.time() * 1000) >= expiry:
+    expiry = entry.expiry
+    if expiry is not None and now_ms() >= expiry:
         if key in store:
             del store[key]
         if side_store and key in side_store:
@@ -98,19 +132,19 @@ def check_expiry(key: str, entry: dict, store: dict, side_store: dict = None) ->
         return True
     return False
 
-def get_valid_entry(key: str, store: dict, side_store: dict = None, expected_type: str = None) -> Optional[dict]:
+def get_valid_entry(key: str, store: dict, side_store: dict = None, expected_type: str = None):
     """
     Retrieves an entry, performing expiry modification and optional type checking.
-    Returns the entry dict if valid, else None.
+    Returns the Entry if valid, else None.
     """
     entry = store.get(key)
-    if not entry:
+    if entry is None:
         return None
     
     if check_expiry(key, entry, store, side_store):
         return None
     
-    if expected_type and entry.get("type") != expected_type:
+    if expected_type and entry.type != expected_type:
         return None
         
     return entry
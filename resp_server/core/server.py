@@ -22,8 +22,9 @@ import socket
 import threading
 import click
 
-from resp_server.core.command_execution import handle_connection
-from resp_server.config import config
+from resp_server.core.command_execution import handle_connection, initialize_datastore
+from resp_server.core.helpers import start_clock
+from resp_server.config import set_config
 
 
 class Server:
@@ -35,6 +36,11 @@ class Server:
 
     def start(self):
         """Starts the Redis-compatible server."""
+        # Load any RDB snapshot here rather than at module import, so merely
+        # importing command_execution (tests, tooling) never touches disk.
+        initialize_datastore()
+        # Millisecond ticker feeding the cached clock behind expiry checks.
+        start_clock()
         try:
             self.server_socket = socket.create_server((self.host, self.port), reuse_port=True)
             # Set a timeout so we can periodically check self.running used for graceful shutdown
@@ -74,10 +80,8 @@ class Server:
 @click.option('--dir', 'rdb_dir', default='.', help='Directory for RDB files')
 @click.option('--dbfilename', default='dump.rdb', help='RDB file name')
 def main(port, rdb_dir, dbfilename):
-    # Populate the global config object
-    config.port = port
-    config.rdb_dir = rdb_dir
-    config.db_filename = dbfilename
+    # Populate the global config object (frozen: swapped, not mutated)
+    set_config(port=port, rdb_dir=rdb_dir, db_filename=dbfilename)
     
     print(f"Server Configuration: Port={port}, RDB Directory={rdb_dir}, DB Filename={dbfilename}")
     server = Server(port=port)
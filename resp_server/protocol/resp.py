@@ -5,25 +5,73 @@ This module handles parsing and encoding of RESP protocol messages.
 RESP is a simple text-based protocol used by Redis for client-server communication.
 """
 
-import re
+import functools
 from typing import Optional
 
 
-# Regex patterns (structure only)
+def parse_resp_command(data: bytes, offset: int = 0) -> tuple[Optional[list[str]], int]:
+    """
+    Parse one RESP array starting at `offset` inside a receive buffer.
+
+    Headers are scanned with bytes.find + int() directly — both single C
+    calls — rather than a regex match, which pays for match-object creation
+    and group extraction on every header.
 
-# Matches: *<number>\r\n
-# This REPLACES:
-#   - data.startswith(b'*')
-#   - data.find(b'\r\n')
-#   - int(data[1:first_crlf])
-ARRAY_HEADER_RE = re.compile(rb'^\*(\d+)\r\n')
+    Returns:
+        (elements, new_offset) when a complete frame was consumed
+        (None, offset) when the frame at `offset` is still incomplete
+    Raises:
+        ValueError on malformed input (not a RESP array / bad UTF-8)
+    """
+    data_len = len(data)
+    if offset >= data_len:
+        return None, offset
+
+    if data[offset] != 0x2A:  # b'*'
+        raise ValueError("expected RESP array")
+
+    crlf = data.find(b"\r\n", offset + 1)
+    if crlf == -1:
+        # '*' seen but no complete "<n>\r\n" yet — wait for more bytes.
+        return None, offset
+    digits = data[offset + 1:crlf]
+    if not digits.isdigit():
+        raise ValueError("invalid RESP array header")
+    array_length = int(digits)
+    pos = crlf + 2  # skip "*<n>\r\n"
+
+    parsed_elements: list[str] = []
+
+    # Parse bulk strings
+    for _ in range(array_length):
+        if pos >= data_len:
+            return None, offset
+        if data[pos] != 0x24:  # b'$'
+            raise ValueError("expected RESP bulk string")
+
+        crlf = data.find(b"\r\n", pos + 1)
+        if crlf == -1:
+            return None, offset
+        digits = data[pos + 1:crlf]
+        if not digits.isdigit():
+            raise ValueError("invalid RESP bulk header")
+        bulk_length = int(digits)
+        content_start = crlf + 2
+        content_end = content_start + bulk_length
+
+        if content_end + 2 > data_len:
+            return None, offset
+
+        try:
+            content = data[content_start:content_end].decode("utf-8")
+        except UnicodeDecodeError:
+            raise ValueError("invalid UTF-8 payload")
+        parsed_elements.append(content)
 
-# Matches: $<number>\r\n
-# This REPLACES:
-#   - data[offset] == b'$'
-#   - find(b'\r\n', offset)
-#   - int(data[offset+1:length_end])
-BULK_HEADER_RE = re.compile(rb'\$(\d+)\r\n')
+        # Skip trailing "\r\n"
+        pos = content_end + 2
+
+    return parsed_elements, pos
 
 
 def parse_resp_array(data: bytes) -> Optional[list[str]]:
@@ -34,76 +82,77 @@ def parse_resp_array(data: bytes) -> Optional[list[str]]:
         list[str] if complete and valid
         None if incomplete or invalid
     """
-
     if not data:
         return None
-
     try:
-        # Parse array header
-        # REPLACES ~6 lines of manual parsing:
-        #   - startswith(b'*')
-        #   - find CRLF
-        #   - slicing for length
-        #   - offset calculation
-        match = ARRAY_HEADER_RE.match(data)
-        if not match:
-            return None
-
-        array_length = int(match.group(1))
-        offset = match.end()  # automatically skips "*<n>\r\n"
-
-        parsed_elements: list[str] = []
-
-        # Parse bulk strings
-
-        for _ in range(array_length):
-            # REPLACES:
-            #   if data[offset] != b'$'
-            #   length_end = find CRLF
-            #   bulk_length slicing
-            match = BULK_HEADER_RE.match(data, offset)
-            if not match:
-                return None
-
-            bulk_length = int(match.group(1))
-            content_start = match.end()
-            content_end = content_start + bulk_length
-
-            # REPLACES:
-            #   if content_end + 2 > len(data)
-            if content_end + 2 > len(data):
-                return None
-
-            # Payload parsing (NO regex here on purpose)
-            content = data[content_start:content_end].decode("utf-8")
-            parsed_elements.append(content)
-
-            # Skip trailing "\r\n"
-            offset = content_end + 2
-
-        return parsed_elements
-
-    except (ValueError, UnicodeDecodeError):
-        # ValueError → invalid integer fields; UnicodeDecodeError → invalid UTF-8 payload
+        elements, _ = parse_resp_command(data, 0)
+    except ValueError:
         return None
+    return elements
 
 
 def encode_simple_string(s: str) -> bytes:
-    return f"+{s}\r\n".encode()
+    return b"+%b\r\n" % s.encode()
+
+# Length prefixes repeat heavily (most payloads are short strings), so the
+# hot path takes a table hit instead of formatting the length per call.
+_BULK_LEN_PREFIX = tuple(b"$%d\r\n" % i for i in range(4096))
 
 def encode_bulk_string(s: str) -> bytes:
     s_bytes = s.encode()
-    return f"${len(s_bytes)}\r\n".encode() + s_bytes + b"\r\n"
+    n = len(s_bytes)
+    if n < 4096:
+        # join sizes the result once; chained + would allocate an
+        # intermediate for the first concatenation.
+        return b"".join((_BULK_LEN_PREFIX[n], s_bytes, b"\r\n"))
+    return b"$%d\r\n%b\r\n" % (n, s_bytes)
+
+# Memoized variant for strings known to repeat (stream field names, config
+# keys). Not used for user values, which would churn the cache.
+encode_bulk_string_cached = functools.lru_cache(maxsize=4096)(encode_bulk_string)
+
+def encode_bulk_pair(f: bytes, v: bytes) -> bytes:
+    """Encodes two already-encoded payloads as consecutive bulk strings.
+
+    Fuses what would otherwise be two encode_bulk_string calls into a single
+    format operation; used for field/value pairs on the stream read path.
+    """
+    return b"$%d\r\n%b\r\n$%d\r\n%b\r\n" % (len(f), f, len(v), v)
 
 def encode_null_bulk_string() -> bytes:
     return b"$-1\r\n"
 
+# Error replies mostly draw from a fixed vocabulary (WRONGTYPE, syntax,
+# wrong argument counts), but some messages embed client-supplied text
+# (unknown command names), so the memo must be bounded or any client could
+# grow it without limit.
+@functools.lru_cache(maxsize=256)
 def encode_error(error_msg: str) -> bytes:
     return f"-{error_msg}\r\n".encode()
 
 def encode_array(items: list[bytes]) -> bytes:
     """Encodes a list of already-encoded RESP items into a RESP array."""
-    return f"*{len(items)}\r\n".encode() + b"".join(items)
+    return b"".join((b"*%d\r\n" % len(items), *items))
+
+def encode_array_of_bulk_strings(items: list[str]) -> bytes:
+    """Encodes a flat array of bulk strings in a single pass.
+
+    Streams header and elements straight into one bytearray, replacing the
+    per-element encode_bulk_string list plus encode_array join (which built
+    an intermediate bytes object per element and then copied them all again).
+    """
+    buf = bytearray(b"*%d\r\n" % len(items))
+    extend = buf.extend
+    for item in items:
+        item_bytes = item.encode()
+        extend(b"$%d\r\n%b\r\n" % (len(item_bytes), item_bytes))
+    return bytes(buf)
+
+# Precomputed replies for the integer range that covers almost all real
+# responses (list sizes, INCR counters, subscriber counts).
+_SMALL_INT_RESP = tuple(b":%d\r\n" % i for i in range(-128, 1025))
 
 def encode_integer(i: int) -> bytes:
-    return f":{i}\r\n".encode()
\ No newline at end of file
+    if -128 <= i <= 1024:
+        return _SMALL_INT_RESP[i + 128]
+    return b":%d\r\n" % i
\ No newline at end of file
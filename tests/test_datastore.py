@@ -16,8 +16,8 @@ class TestDataStore(unittest.TestCase):
         set_string("key1", "value1", None)
         entry = get_data_entry("key1")
         self.assertIsNotNone(entry)
-        self.assertEqual(entry["value"], "value1")
-        self.assertEqual(entry["type"], "string")
+        self.assertEqual(entry.value, "value1")
+        self.assertEqual(entry.type, "string")
 
     def test_expiry(self):
         # Set expiry to 100ms from now